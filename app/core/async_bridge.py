@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from functools import wraps
+from typing import Any, Callable, Coroutine, Optional
+
+from app.core.cache import cache
+from app.core.http import close_http_clients
+from app.core.settings import settings
+from app.db.session import close_db
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBridge:
+    """Runs coroutines from synchronous code on one long-lived event loop.
+
+    Celery calls task functions synchronously, so each worker process starts a
+    bridge at ``worker_process_init``: an event loop in a daemon thread on
+    which the process-wide clients (the cache's Redis pool, HTTP clients and
+    the database engine from app.db.session) are opened and reused by every
+    async task in that process instead of being rebuilt per task.
+    """
+
+    def __init__(self, max_concurrency: int = 100):
+        self.max_concurrency = max_concurrency
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Tasks in a threads pool may all start the bridge lazily at once
+        self._lock = threading.Lock()
+        self._opened = False
+
+    @property
+    def running(self) -> bool:
+        """Whether the loop is running and its shared resources are open."""
+        return self._opened and self.loop is not None and self.loop.is_running()
+
+    async def _open(self) -> None:
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Open the Redis pool that payload references are resolved through up
+        # front, so the first task doesn't pay for it; HTTP clients and the
+        # database engine are created on first use, on this loop
+        await cache.connect()
+        # Near cache invalidation listener, memory cache sweeper and the Redis
+        # health probe run here too, as in the API process
+        await cache.start()
+
+    async def aclose(self) -> None:
+        """Close the clients opened on the bridge loop."""
+        await close_http_clients()
+        # Stops the cache's background tasks before closing its pool
+        await cache.close()
+        await close_db()
+
+    def start(self) -> None:
+        """Start the event loop thread and open the shared resources."""
+        with self._lock:
+            if self.running:
+                return
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self.loop.run_forever, name="async-bridge", daemon=True)
+            self._thread.start()
+            asyncio.run_coroutine_threadsafe(self._open(), self.loop).result()
+            self._opened = True
+            logger.info(f"Started async bridge with concurrency {self.max_concurrency}")
+
+    def stop(self, timeout: float = 10) -> None:
+        """Close the shared resources and stop the loop."""
+        with self._lock:
+            if not self.running:
+                return
+            self._opened = False
+            try:
+                asyncio.run_coroutine_threadsafe(self.aclose(), self.loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"Error closing async bridge resources: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+            self.loop.close()
+            self.loop = None
+            self._thread = None
+
+    async def _limited(self, coro: Coroutine) -> Any:
+        async with self._semaphore:
+            return await coro
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the bridge loop and block until it finishes."""
+        if not self.running:
+            self.start()
+        future: Future = asyncio.run_coroutine_threadsafe(self._limited(coro), self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Timeouts and Celery's time limit exceptions interrupt the waiting thread
+            future.cancel()
+            raise
+
+
+bridge = AsyncBridge(max_concurrency=settings.CELERY_ASYNC_CONCURRENCY)
+
+
+def run_async(func: Callable[..., Coroutine]) -> Callable[..., Any]:
+    """Let Celery run a coroutine function on the worker's event loop bridge."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return bridge.run(func(*args, **kwargs))
+
+    # Lets the fallback dispatcher await the coroutine directly
+    wrapper.__async_task__ = func
+    return wrapper
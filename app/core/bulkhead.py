@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from app.core.metrics import (
+    BULKHEAD_INFLIGHT,
+    BULKHEAD_LIMIT,
+    BULKHEAD_QUEUE_WAIT_SECONDS,
+    BULKHEAD_REJECTED,
+)
+from app.core.retry import remaining_time
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StaticLimit:
+    """Fixed concurrency limit."""
+
+    def __init__(self, limit: int = 50, **_: Any):
+        self.limit = float(limit)
+
+    def update(self, rtt: float, inflight: int, dropped: bool) -> None:
+        pass
+
+
+class AIMDLimit:
+    """Additive increase, multiplicative decrease.
+
+    The limit grows by one after a success while at least half of it is in
+    use, and is cut by ``backoff_ratio`` after a failure or a call slower than
+    ``latency_threshold``.
+    """
+
+    def __init__(
+        self,
+        limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        backoff_ratio: float = 0.9,
+        latency_threshold: float = 5.0,
+        **_: Any,
+    ):
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_threshold = latency_threshold
+
+    def update(self, rtt: float, inflight: int, dropped: bool) -> None:
+        if dropped or rtt > self.latency_threshold:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        elif inflight * 2 >= self.limit:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+
+class GradientLimit:
+    """Latency gradient limit.
+
+    Compares a short-term average latency with a slowly moving long-term
+    baseline: the limit shrinks in proportion as latency rises above
+    ``tolerance`` times the baseline, and grows by about its square root while
+    latency holds steady. Failures count as a doubled latency sample.
+    """
+
+    def __init__(
+        self,
+        limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        long_window: int = 600,
+        **_: Any,
+    ):
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.long_window = long_window
+        self.short_rtt: Optional[float] = None
+        self.long_rtt: Optional[float] = None
+
+    def update(self, rtt: float, inflight: int, dropped: bool) -> None:
+        if dropped:
+            rtt = 2 * (self.short_rtt or rtt)
+        if self.long_rtt is None:
+            self.short_rtt = self.long_rtt = rtt
+            return
+        self.short_rtt += (rtt - self.short_rtt) * 0.1
+        self.long_rtt += (rtt - self.long_rtt) / self.long_window
+        # Don't grow while the dependency isn't the bottleneck
+        if inflight * 2 < self.limit and not dropped:
+            return
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / max(self.short_rtt, 1e-9)))
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        new_limit = self.limit * (1 - self.smoothing) + new_limit * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, new_limit))
+
+
+LIMITS = {"static": StaticLimit, "aimd": AIMDLimit, "gradient": GradientLimit}
+
+
+class BulkheadFullError(Exception):
+    """Raised when a bulkhead rejects a call instead of running it."""
+    pass
+
+
+class Bulkhead:
+    """Caps concurrent calls to one dependency.
+
+    Calls over the limit wait in a FIFO queue of at most ``max_queue`` for up
+    to ``queue_timeout`` (or the current retry deadline, if sooner) and are
+    rejected with BulkheadFullError when the queue is full or the wait runs
+    out, so a slow dependency can't tie up every coroutine in the process.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: Any = None,
+        max_queue: int = 100,
+        queue_timeout: float = 1.0,
+    ):
+        self.name = name
+        self.limit = limit or StaticLimit()
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        BULKHEAD_LIMIT.labels(name).set(self.limit.limit)
+
+    @property
+    def capacity(self) -> int:
+        return max(1, int(self.limit.limit))
+
+    def _reject(self, reason: str) -> BulkheadFullError:
+        BULKHEAD_REJECTED.labels(self.name, reason).inc()
+        return BulkheadFullError(f"Bulkhead {self.name} rejected call: {reason}")
+
+    def _take(self) -> None:
+        self.inflight += 1
+        BULKHEAD_INFLIGHT.labels(self.name).set(self.inflight)
+
+    def _wake(self) -> None:
+        while self._waiters and self.inflight < self.capacity:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._take()
+                waiter.set_result(None)
+
+    async def acquire(self) -> None:
+        """Take a slot, queueing for one if the bulkhead is full."""
+        if self.inflight < self.capacity and not self._waiters:
+            self._take()
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+
+        timeout = self.queue_timeout
+        remaining = remaining_time()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        if timeout <= 0:
+            raise self._reject("queue_timeout")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as the wait ended
+                self._free()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject("queue_timeout") from None
+            raise
+        finally:
+            BULKHEAD_QUEUE_WAIT_SECONDS.labels(self.name).observe(time.monotonic() - start)
+
+    def _free(self) -> None:
+        self.inflight -= 1
+        BULKHEAD_INFLIGHT.labels(self.name).set(self.inflight)
+        self._wake()
+
+    def release(self, rtt: float, dropped: bool = False) -> None:
+        """Return a slot and feed the call's latency and outcome to the limit."""
+        self.limit.update(rtt, self.inflight, dropped)
+        BULKHEAD_LIMIT.labels(self.name).set(self.limit.limit)
+        self._free()
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call ``func`` once a slot is free."""
+        await self.acquire()
+        start = time.monotonic()
+        dropped = True
+        try:
+            result = await func(*args, **kwargs)
+            dropped = False
+            return result
+        finally:
+            self.release(time.monotonic() - start, dropped)
+
+
+# One bulkhead per downstream dependency, shared by everything calling it
+bulkheads: Dict[str, Bulkhead] = {}
+
+
+def get_bulkhead(name: str, strategy: Optional[str] = None, **config: Any) -> Bulkhead:
+    """Return the named bulkhead, creating it from settings and ``config`` on first use."""
+    bulkhead = bulkheads.get(name)
+    if bulkhead is None:
+        strategy = strategy or settings.BULKHEAD_STRATEGY
+        if strategy not in LIMITS:
+            raise ValueError(f"Unknown bulkhead strategy {strategy!r}, expected one of {sorted(LIMITS)}")
+        options: Dict[str, Any] = {
+            "max_queue": settings.BULKHEAD_MAX_QUEUE,
+            "queue_timeout": settings.BULKHEAD_QUEUE_TIMEOUT,
+        }
+        limit_options: Dict[str, Any] = {
+            "limit": settings.BULKHEAD_LIMIT,
+            "min_limit": settings.BULKHEAD_MIN_LIMIT,
+            "max_limit": settings.BULKHEAD_MAX_LIMIT,
+            "latency_threshold": settings.CIRCUIT_BREAKER_SLOW_CALL_DURATION,
+        }
+        for key, value in config.items():
+            (options if key in options else limit_options)[key] = value
+        limit = LIMITS[strategy](**limit_options)
+        bulkhead = bulkheads[name] = Bulkhead(name, limit, **options)
+        logger.info(f"Created {strategy} bulkhead {name} with limit {bulkhead.capacity}")
+    return bulkhead
@@ -1,101 +1,851 @@
-from typing import Any, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Union,
+)
 import redis.asyncio as redis
+from redis.exceptions import LockError
 from app.core.settings import settings
+import asyncio
+import hashlib
+import inspect
+import json
 import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import date
+from enum import Enum
 from functools import wraps
-import json
 import time
+import uuid
+
+from prometheus_client import REGISTRY
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.memory_cache import MemoryCache
+from app.core.metrics import (
+    CACHE_BACKEND_MODE,
+    CACHE_FALLBACK_ACTIVATIONS,
+    CACHE_LOOKUPS,
+    CACHE_OPERATION_SECONDS,
+    CACHE_PAYLOAD_BYTES,
+    CACHED_CALLS,
+    CACHED_LOAD_SECONDS,
+    MemoryCacheCollector,
+)
+from app.core.serialization import Serializer
 
 logger = logging.getLogger(__name__)
 
 # In-memory fallback cache
-fallback_cache = {}
+fallback_cache = MemoryCache(
+    max_entries=settings.CACHE_MEMORY_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MEMORY_MAX_BYTES,
+    sweep_interval=settings.CACHE_MEMORY_SWEEP_INTERVAL,
+)
+
+def _key_default(value: Any) -> Any:
+    """Reduce common non-JSON values to a stable representation for key hashing."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(
+        f"Cannot build a cache key from {type(value).__name__}; "
+        "pass key_builder to cached()"
+    )
+
+
+def make_key(namespace: str, *parts: Any, version: int = 1) -> str:
+    """Build a short, stable cache key from a namespace and key parts."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=_key_default)
+    digest = hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+    return f"{settings.CACHE_KEY_PREFIX}:{namespace}:v{version}:{digest}"
+
+
+def tag_key(tag: str) -> str:
+    """Return the key of the set that indexes entries carrying a tag."""
+    return f"{settings.CACHE_KEY_PREFIX}:tag:{tag}"
+
+
+def _tag_fallback(key: str, tags: Iterable[str], expire: int) -> None:
+    """Record tags for an entry held in the in-memory fallback cache."""
+    for tag in tags:
+        members = fallback_cache.get(tag_key(tag)) or set()
+        members.add(key)
+        fallback_cache.set(tag_key(tag), members, max(expire, settings.CACHE_TAG_TTL))
+
+
+def _invalidate_fallback_tags(tags: Iterable[str]) -> Set[str]:
+    """Drop tagged entries from the in-memory fallback cache."""
+    keys: Set[str] = set()
+    for tag in tags:
+        keys |= fallback_cache.pop(tag_key(tag)) or set()
+    for key in keys:
+        fallback_cache.delete(key)
+    return keys
+
+
+def key_namespace(key: str) -> str:
+    """Return the namespace segment of a cache key, used to label metrics."""
+    prefix = f"{settings.CACHE_KEY_PREFIX}:"
+    if key.startswith(prefix):
+        key = key[len(prefix):]
+    return key.split(":", 1)[0]
+
+
+def _record_lookup(key: str, backend: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(key_namespace(key), backend, "hit" if hit else "miss").inc()
+
+
+def _record_payload(key: str, direction: str, payload: bytes) -> None:
+    CACHE_PAYLOAD_BYTES.labels(key_namespace(key), direction).observe(len(payload))
+
+
+def _timed(operation: str):
+    """Record the latency of a Cache method, labelled by key namespace and backend."""
+    def decorator(method):
+        @wraps(method)
+        async def wrapper(self: "Cache", keys: Any, *args: Any, **kwargs: Any) -> Any:
+            if not isinstance(keys, (str, dict)):
+                keys = list(keys)
+            if isinstance(keys, str):
+                namespaces = {key_namespace(keys)}
+            else:
+                namespaces = {key_namespace(key) for key in keys}
+            namespace = namespaces.pop() if len(namespaces) == 1 else "mixed"
+            backend = self.backend
+            start = time.perf_counter()
+            try:
+                return await method(self, keys, *args, **kwargs)
+            finally:
+                CACHE_OPERATION_SECONDS.labels(operation, namespace, backend).observe(
+                    time.perf_counter() - start
+                )
+        return wrapper
+    return decorator
+
+
+class BatchLoader:
+    """Coalesces gets issued in the same event-loop tick into one multi-key fetch."""
+
+    def __init__(self, cache: "Cache", max_batch_size: int = 100):
+        self.cache = cache
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._scheduled = False
+        # Keeps in-flight batches referenced until they finish
+        self._batches: Set[asyncio.Task] = set()
+
+    async def load(self, key: str) -> Optional[Any]:
+        """Queue a key for the next batch and wait for its value."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(key, []).append(future)
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self._dispatch)
+        return await future
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        self._scheduled = False
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = {key: pending[key] for key in keys[start:start + self.max_batch_size]}
+            task = asyncio.ensure_future(self._load_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _load_batch(self, batch: Dict[str, List[asyncio.Future]]) -> None:
+        try:
+            # Untimed, as each batched get already records its own latency
+            values = await self.cache._get_many(list(batch))
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for key, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(values.get(key))
+
+
+class RedisHealth:
+    """Trips to the in-memory path after repeated Redis failures and probes for recovery.
+
+    ``on_recover`` is awaited with the client once a probe succeeds, before
+    traffic returns to Redis; if it raises, the probe counts as failed.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        failure_window: float = 10,
+        probe_interval: float = 5,
+        on_recover: Optional[Callable[[redis.Redis], Awaitable[None]]] = None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.probe_interval = probe_interval
+        self.on_recover = on_recover
+        self.failures: Deque[float] = deque()
+        self.healthy = True
+        self._probe: Optional[asyncio.Task] = None
+        self._report()
+
+    def _report(self) -> None:
+        CACHE_BACKEND_MODE.labels(backend="redis").set(1 if self.healthy else 0)
+        CACHE_BACKEND_MODE.labels(backend="memory").set(0 if self.healthy else 1)
+
+    def record_failure(self, client: redis.Redis) -> None:
+        """Count a failure, tripping to the fallback path at the threshold."""
+        now = time.monotonic()
+        self.failures.append(now)
+        while self.failures[0] <= now - self.failure_window:
+            self.failures.popleft()
+        if self.healthy and len(self.failures) >= self.failure_threshold:
+            logger.warning(
+                f"Redis failed {len(self.failures)} times in {self.failure_window}s, "
+                "using in-memory cache"
+            )
+            self.healthy = False
+            self._report()
+            self._probe = asyncio.get_running_loop().create_task(self._probe_loop(client))
+
+    async def _probe_loop(self, client: redis.Redis) -> None:
+        while not self.healthy:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await client.ping()
+                if self.on_recover is not None:
+                    await self.on_recover(client)
+            except Exception as e:
+                logger.debug(f"Redis probe failed: {e}")
+                continue
+            logger.info("Redis is reachable again, leaving in-memory cache")
+            self.failures.clear()
+            self.healthy = True
+            self._report()
+
+    async def stop(self) -> None:
+        """Stop probing."""
+        if self._probe is not None:
+            self._probe.cancel()
+            try:
+                await self._probe
+            except asyncio.CancelledError:
+                pass
+            self._probe = None
+
 
 class Cache:
     def __init__(self):
-        self.redis_client = None
+        # Redis pool is created on first use, so building the cache is free
+        self._redis_client: Optional[redis.Redis] = None
         self.use_fallback = settings.REDIS_FALLBACK
-        
-        if not self.use_fallback:
+        # Process-local near cache in front of Redis, holding raw payloads
+        self.local_cache: Optional[MemoryCache] = None
+        self.instance_id = uuid.uuid4().hex
+        self.serializer = Serializer(
+            codec=settings.CACHE_CODEC,
+            compression=settings.CACHE_COMPRESSION,
+            compression_min_bytes=settings.CACHE_COMPRESSION_MIN_BYTES,
+        )
+        self._listener: Optional[asyncio.Task] = None
+
+        # Keys and tags changed in memory while Redis was tripped, whose Redis
+        # copies are stale and get cleared before traffic returns to Redis
+        self._degraded_keys: Set[str] = set()
+        self._degraded_tags: Set[str] = set()
+        self._degraded_overflow = False
+        self.health = RedisHealth(
+            failure_threshold=settings.REDIS_FAILURE_THRESHOLD,
+            failure_window=settings.REDIS_FAILURE_WINDOW,
+            probe_interval=settings.REDIS_PROBE_INTERVAL,
+            on_recover=self._clear_degraded_writes,
+        )
+
+        if not self.use_fallback and settings.CACHE_L1_ENABLED:
+            self.local_cache = MemoryCache(
+                max_entries=settings.CACHE_L1_MAX_ENTRIES,
+                sweep_interval=settings.CACHE_L1_TTL,
+            )
+
+        # Batches concurrent gets into a single MGET
+        self.loader = BatchLoader(self, settings.CACHE_BATCH_MAX_SIZE)
+        self.auto_batch = settings.CACHE_AUTO_BATCH
+
+        if self.use_fallback:
+            CACHE_BACKEND_MODE.labels(backend="redis").set(0)
+            CACHE_BACKEND_MODE.labels(backend="memory").set(1)
+
+    @property
+    def redis_client(self) -> Optional[redis.Redis]:
+        """Redis client, or None in fallback mode."""
+        if self._redis_client is None and not self.use_fallback:
+            # Bounded pool: callers wait briefly for a connection instead of opening more
+            pool = redis.BlockingConnectionPool(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                password=settings.REDIS_PASSWORD,
+                db=settings.REDIS_DB,
+                decode_responses=False,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                timeout=settings.REDIS_POOL_TIMEOUT,
+                socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            )
+            self._redis_client = redis.Redis(connection_pool=pool)
+        return self._redis_client
+
+    async def connect(self) -> None:
+        """Open the first Redis connection, falling back to memory until it answers."""
+        if self.use_fallback:
+            return
+        try:
+            await self.redis_client.ping()
+            logger.info("Successfully connected to Redis")
+        except Exception as e:
+            logger.warning(f"Failed to connect to Redis: {e}")
+            self._record_error("ping", e)
+
+    async def start(self) -> None:
+        """Start background maintenance for the in-process caches."""
+        fallback_cache.start()
+        if self.local_cache is not None:
+            self.local_cache.start()
+            self._listener = asyncio.create_task(self._listen_for_invalidations())
+
+    async def stop(self) -> None:
+        """Stop background maintenance for the in-process caches."""
+        if self._listener is not None:
+            self._listener.cancel()
             try:
-                self.redis_client = redis.Redis(
-                    host=settings.REDIS_HOST,
-                    port=settings.REDIS_PORT,
-                    password=settings.REDIS_PASSWORD,
-                    db=settings.REDIS_DB,
-                    decode_responses=True,
-                )
-                logger.info("Successfully connected to Redis")
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self.local_cache is not None:
+            await self.local_cache.stop()
+        await self.health.stop()
+        await fallback_cache.stop()
+
+    async def close(self) -> None:
+        """Stop maintenance and close the Redis connection pool."""
+        await self.stop()
+        if self._redis_client is not None:
+            await self._redis_client.aclose()
+            await self._redis_client.connection_pool.disconnect()
+            self._redis_client = None
+
+    def _use_memory(self) -> bool:
+        """Whether calls should skip Redis and use the in-memory cache."""
+        return self.use_fallback or not self.health.healthy
+
+    @property
+    def backend(self) -> str:
+        """Name of the backend currently serving requests."""
+        return "memory" if self._use_memory() else "redis"
+
+    def _record_error(self, operation: str, error: Exception) -> None:
+        logger.error(f"Redis {operation} error: {error}")
+        CACHE_FALLBACK_ACTIVATIONS.labels(operation).inc()
+        self.health.record_failure(self.redis_client)
+
+    def _track_degraded(self, keys: Iterable[str] = (), tags: Iterable[str] = ()) -> None:
+        """Remember keys and tags changed in memory while Redis is tripped."""
+        if self.health.healthy:
+            return
+        keys, tags = set(keys), set(tags)
+        tracked = len(self._degraded_keys) + len(self._degraded_tags)
+        if tracked + len(keys) + len(tags) > settings.REDIS_RECOVERY_MAX_KEYS:
+            self._degraded_overflow = True
+            return
+        self._degraded_keys |= keys
+        self._degraded_tags |= tags
+
+    async def _clear_degraded_writes(self, client: redis.Redis) -> None:
+        """Delete Redis copies of keys and tags changed while Redis was tripped."""
+        if self._degraded_overflow:
+            logger.warning(
+                f"Over {settings.REDIS_RECOVERY_MAX_KEYS} keys changed while Redis was unavailable, "
+                "some may be stale until they expire"
+            )
+            self._degraded_overflow = False
+        # Writes made meanwhile are still tracked and cleared by the next pass
+        while self._degraded_keys or self._degraded_tags:
+            keys, self._degraded_keys = self._degraded_keys, set()
+            tags, self._degraded_tags = self._degraded_tags, set()
+            try:
+                if tags:
+                    tag_keys = [tag_key(tag) for tag in tags]
+                    async with client.pipeline(transaction=True) as pipe:
+                        for key in tag_keys:
+                            pipe.smembers(key)
+                        pipe.delete(*tag_keys)
+                        results = await pipe.execute()
+                    keys |= {member.decode() for result in results[:-1] for member in result}
+                if keys:
+                    async with client.pipeline(transaction=False) as pipe:
+                        pipe.delete(*keys)
+                        for key in keys:
+                            self._publish_invalidation(pipe, key)
+                        await pipe.execute()
+            except BaseException:
+                self._degraded_keys |= keys
+                self._degraded_tags |= tags
+                raise
+            logger.info(f"Cleared {len(keys)} keys changed while Redis was unavailable")
+        if self.local_cache is not None:
+            # Near cache entries from before the trip may have changed since
+            self.local_cache.clear()
+
+    def _publish_invalidation(self, pipe, key: str) -> None:
+        """Queue an invalidation message for other workers on a pipeline."""
+        if self.local_cache is not None:
+            pipe.publish(
+                settings.CACHE_INVALIDATION_CHANNEL,
+                f"{self.instance_id}:{key}",
+            )
+
+    async def _listen_for_invalidations(self) -> None:
+        """Evict keys from the near cache when other workers change them."""
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+                while True:
+                    # Poll with a timeout, since blocking reads are bounded by the socket timeout
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None:
+                        continue
+                    origin, _, key = message["data"].decode().partition(":")
+                    if origin != self.instance_id:
+                        self.local_cache.delete(key)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.warning(f"Failed to connect to Redis: {e}")
-                self.use_fallback = True
-    
+                logger.error(f"Redis invalidation listener error: {e}")
+                # Messages may have been missed while disconnected
+                self.local_cache.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    @_timed("get")
     async def get(self, key: str) -> Optional[Any]:
         """Get value from cache."""
-        if self.use_fallback:
-            return fallback_cache.get(key)
-        
+        if self._use_memory():
+            value = fallback_cache.get(key)
+            _record_lookup(key, "memory", value is not None)
+            return value
+
+        if self.local_cache is not None:
+            value = self.local_cache.get(key)
+            if value is not None:
+                _record_lookup(key, "local", True)
+                return self.serializer.loads(value)
+
+        if self.auto_batch:
+            # Lookups are recorded by the batched fetch
+            return await self.loader.load(key)
+
         try:
             value = await self.redis_client.get(key)
-            return json.loads(value) if value else None
         except Exception as e:
-            logger.error(f"Redis get error: {e}")
-            return fallback_cache.get(key)
-    
-    async def set(self, key: str, value: Any, expire: int = 3600) -> bool:
-        """Set value in cache."""
-        if self.use_fallback:
-            fallback_cache[key] = value
+            self._record_error("get", e)
+            value = fallback_cache.get(key)
+            _record_lookup(key, "memory", value is not None)
+            return value
+
+        _record_lookup(key, "redis", bool(value))
+        if not value:
+            return None
+        _record_payload(key, "read", value)
+        if self.local_cache is not None:
+            self.local_cache.set(key, value, settings.CACHE_L1_TTL)
+        return self.serializer.loads(value)
+
+    @_timed("set")
+    async def set(
+        self, key: str, value: Any, expire: int = 3600, tags: Iterable[str] = ()
+    ) -> bool:
+        """Set value in cache, optionally tagging it for group invalidation."""
+        tags = list(tags)
+        if self._use_memory():
+            fallback_cache.set(key, value, expire)
+            _tag_fallback(key, tags, expire)
+            self._track_degraded([key])
             return True
-        
+
         try:
-            await self.redis_client.set(
-                key,
-                json.dumps(value),
-                ex=expire
-            )
+            payload = self.serializer.dumps(value)
+            _record_payload(key, "write", payload)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(key, payload, ex=expire)
+                for tag in tags:
+                    pipe.sadd(tag_key(tag), key)
+                    pipe.expire(tag_key(tag), max(expire, settings.CACHE_TAG_TTL))
+                self._publish_invalidation(pipe, key)
+                await pipe.execute()
+            if self.local_cache is not None:
+                self.local_cache.set(key, payload, min(expire, settings.CACHE_L1_TTL))
             return True
         except Exception as e:
-            logger.error(f"Redis set error: {e}")
-            fallback_cache[key] = value
+            self._record_error("set", e)
+            fallback_cache.set(key, value, expire)
+            _tag_fallback(key, tags, expire)
+            self._track_degraded([key])
             return True
-    
+
+    @_timed("delete")
     async def delete(self, key: str) -> bool:
         """Delete value from cache."""
-        if self.use_fallback:
-            fallback_cache.pop(key, None)
+        if self._use_memory():
+            fallback_cache.delete(key)
+            self._track_degraded([key])
+            return True
+
+        if self.local_cache is not None:
+            self.local_cache.delete(key)
+
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(key)
+                self._publish_invalidation(pipe, key)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            self._record_error("delete", e)
+            fallback_cache.delete(key)
+            self._track_degraded([key])
+            return True
+
+    @_timed("get_many")
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several values from cache in one round trip, omitting missing keys."""
+        return await self._get_many(keys)
+
+    async def _get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(dict.fromkeys(keys))
+        values: Dict[str, Any] = {}
+
+        if self._use_memory():
+            return self._get_many_from_memory(keys)
+
+        missing = []
+        for key in keys:
+            payload = self.local_cache.get(key) if self.local_cache is not None else None
+            if payload is not None:
+                _record_lookup(key, "local", True)
+                values[key] = self.serializer.loads(payload)
+            else:
+                missing.append(key)
+        if not missing:
+            return values
+
+        try:
+            payloads = await self.redis_client.mget(missing)
+        except Exception as e:
+            self._record_error("mget", e)
+            values.update(self._get_many_from_memory(missing))
+            return values
+
+        for key, payload in zip(missing, payloads):
+            _record_lookup(key, "redis", bool(payload))
+            if payload:
+                _record_payload(key, "read", payload)
+                if self.local_cache is not None:
+                    self.local_cache.set(key, payload, settings.CACHE_L1_TTL)
+                values[key] = self.serializer.loads(payload)
+        return values
+
+    def _get_many_from_memory(self, keys: List[str]) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        for key in keys:
+            value = fallback_cache.get(key)
+            _record_lookup(key, "memory", value is not None)
+            if value is not None:
+                values[key] = value
+        return values
+
+    @_timed("set_many")
+    async def set_many(self, mapping: Dict[str, Any], expire: int = 3600) -> bool:
+        """Set several values in cache in one pipelined round trip."""
+        if self._use_memory():
+            for key, value in mapping.items():
+                fallback_cache.set(key, value, expire)
+            self._track_degraded(mapping)
             return True
-        
+
         try:
-            await self.redis_client.delete(key)
+            payloads = {key: self.serializer.dumps(value) for key, value in mapping.items()}
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, payload in payloads.items():
+                    _record_payload(key, "write", payload)
+                    pipe.set(key, payload, ex=expire)
+                    self._publish_invalidation(pipe, key)
+                await pipe.execute()
+            if self.local_cache is not None:
+                for key, payload in payloads.items():
+                    self.local_cache.set(key, payload, min(expire, settings.CACHE_L1_TTL))
             return True
         except Exception as e:
-            logger.error(f"Redis delete error: {e}")
-            fallback_cache.pop(key, None)
+            self._record_error("set_many", e)
+            for key, value in mapping.items():
+                fallback_cache.set(key, value, expire)
+            self._track_degraded(mapping)
+            return True
+
+    @_timed("delete_many")
+    async def delete_many(self, keys: Iterable[str]) -> bool:
+        """Delete several values from cache in one pipelined round trip."""
+        keys = list(keys)
+        if not keys:
             return True
 
+        if self._use_memory():
+            for key in keys:
+                fallback_cache.delete(key)
+            self._track_degraded(keys)
+            return True
+
+        if self.local_cache is not None:
+            for key in keys:
+                self.local_cache.delete(key)
+
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(*keys)
+                for key in keys:
+                    self._publish_invalidation(pipe, key)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            self._record_error("delete_many", e)
+            for key in keys:
+                fallback_cache.delete(key)
+            self._track_degraded(keys)
+            return True
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Delete every entry carrying any of the given tags."""
+        # Entries cached in memory while Redis was unavailable carry tags too
+        keys = _invalidate_fallback_tags(tags)
+        if self._use_memory() or not tags:
+            self._track_degraded(tags=tags)
+            return len(keys)
+
+        tag_keys = [tag_key(tag) for tag in tags]
+        try:
+            # Read and drop the tag sets atomically so concurrent tagging isn't lost
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                for key in tag_keys:
+                    pipe.smembers(key)
+                pipe.delete(*tag_keys)
+                results = await pipe.execute()
+        except Exception as e:
+            self._record_error("invalidate_tags", e)
+            self._track_degraded(tags=tags)
+            return len(keys)
+
+        members = {member.decode() for result in results[:-1] for member in result}
+        await self.delete_many(members)
+        return len(keys | members)
+
+    @asynccontextmanager
+    async def lock(
+        self, name: str, timeout: int = 10, blocking: bool = True
+    ) -> AsyncIterator[bool]:
+        """Hold a Redis lock shared across processes, yielding whether it was acquired."""
+        if self._use_memory():
+            yield True
+            return
+
+        redis_lock = self.redis_client.lock(
+            name, timeout=timeout, blocking=blocking, blocking_timeout=timeout
+        )
+        try:
+            acquired = await redis_lock.acquire()
+        except Exception as e:
+            self._record_error("lock", e)
+            yield True
+            return
+
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    await redis_lock.release()
+                except LockError:
+                    # The lock expired while held; another process may own it now
+                    pass
+                except Exception as e:
+                    logger.error(f"Redis unlock error: {e}")
+
 # Global cache instance
 cache = Cache()
 
-def cached(expire: int = 3600):
-    """Decorator for caching function results."""
+REGISTRY.register(
+    MemoryCacheCollector(lambda: {"fallback": fallback_cache, "local": cache.local_cache})
+)
+
+# Parameters that hold the caller's database session
+SESSION_PARAMETERS = ("db", "session")
+
+
+def _takes_session(signature: inspect.Signature) -> bool:
+    """Whether a function is passed a request-scoped database session."""
+    for name, parameter in signature.parameters.items():
+        annotation = parameter.annotation
+        if name in SESSION_PARAMETERS or (
+            isinstance(annotation, type) and issubclass(annotation, (AsyncSession, Session))
+        ):
+            return True
+    return False
+
+
+# In-flight loads per cache key, shared by concurrent callers in this process
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+def _single_flight(key: str, load: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+    """Return the running load for a key, starting one if none is in flight."""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(load())
+        _inflight[key] = task
+
+        def _done(finished: asyncio.Task) -> None:
+            if _inflight.get(key) is finished:
+                del _inflight[key]
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.warning(f"Cache load for {key} failed: {finished.exception()}")
+
+        task.add_done_callback(_done)
+    return task
+
+
+def cached(
+    expire: int = 3600,
+    stale_ttl: int = 0,
+    lock: bool = False,
+    lock_timeout: int = 10,
+    key_builder: Optional[Callable[..., Any]] = None,
+    namespace: Optional[str] = None,
+    version: int = 1,
+    tags: Union[Callable[..., Iterable[str]], Iterable[str]] = (),
+    ignore: Iterable[str] = ("self", "cls"),
+):
+    """Decorator for caching function results.
+
+    Keys are hashed from ``namespace`` (the function's qualified name by
+    default), ``version`` and either ``key_builder(*args, **kwargs)`` or the
+    bound arguments minus those named in ``ignore``. ``tags`` is a list of
+    tags, or a function of the arguments returning one, for use with
+    ``cache.invalidate_tags``.
+
+    Concurrent misses for the same key are coalesced into a single call. With
+    ``lock`` the call is also serialized across processes through a Redis lock.
+    With ``stale_ttl`` an expired value is still served for that many seconds
+    while a single background task refreshes it.
+
+    Shared and background loads run in tasks detached from the caller, so
+    functions taking a database session (see ``SESSION_PARAMETERS``) load in
+    the caller's own task instead, and can't use ``stale_ttl`` or ``lock``.
+    Sessions are never part of the key: name them in ``ignore``.
+    """
+    ignored = set(ignore)
+
     def decorator(func):
+        signature = inspect.signature(func)
+        cache_namespace = namespace or f"{func.__module__}.{func.__qualname__}"
+        takes_session = _takes_session(signature)
+        if takes_session and (stale_ttl or lock):
+            raise ValueError(
+                f"{func.__qualname__} takes a database session, which background and "
+                "locked loads would use after the request is done with it; "
+                "cache a function that opens its own session instead"
+            )
+
+        def build_key(args: tuple, kwargs: dict) -> str:
+            if key_builder is not None:
+                return make_key(cache_namespace, key_builder(*args, **kwargs), version=version)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            parts = {
+                name: value for name, value in bound.arguments.items() if name not in ignored
+            }
+            return make_key(cache_namespace, parts, version=version)
+
+        async def load(key: str, args: tuple, kwargs: dict) -> Any:
+            start = time.perf_counter()
+            result = await func(*args, **kwargs)
+            CACHED_LOAD_SECONDS.labels(cache_namespace).observe(time.perf_counter() - start)
+            entry = {"value": result, "fresh_until": time.time() + expire}
+            entry_tags = tags(*args, **kwargs) if callable(tags) else tags
+            await cache.set(key, entry, expire + stale_ttl, tags=entry_tags)
+            return result
+
+        async def load_locked(key: str, args: tuple, kwargs: dict, blocking: bool) -> Any:
+            async with cache.lock(f"lock:{key}", lock_timeout, blocking) as acquired:
+                if acquired:
+                    # Another process may have refreshed the entry while we waited
+                    entry = await cache.get(key)
+                    if entry is not None and entry["fresh_until"] > time.time():
+                        return entry["value"]
+                elif not blocking:
+                    return None
+                return await load(key, args, kwargs)
+
+        def start_load(key: str, args: tuple, kwargs: dict, blocking: bool = True) -> asyncio.Task:
+            # Background refreshes may give up on the lock, so never share them with misses
+            flight_key = key if blocking else f"{key}:refresh"
+            if lock:
+                return _single_flight(flight_key, lambda: load_locked(key, args, kwargs, blocking))
+            return _single_flight(flight_key, lambda: load(key, args, kwargs))
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Generate cache key
-            key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-            
+            key = build_key(args, kwargs)
+
             # Try to get from cache
-            cached_value = await cache.get(key)
-            if cached_value is not None:
-                return cached_value
-            
-            # Execute function
-            result = await func(*args, **kwargs)
-            
-            # Cache result
-            await cache.set(key, result, expire)
-            
-            return result
+            entry = await cache.get(key)
+            if entry is not None:
+                if entry["fresh_until"] <= time.time():
+                    # Serve the stale value and refresh it in the background
+                    CACHED_CALLS.labels(cache_namespace, "stale").inc()
+                    start_load(key, args, kwargs, blocking=False)
+                else:
+                    CACHED_CALLS.labels(cache_namespace, "hit").inc()
+                return entry["value"]
+
+            CACHED_CALLS.labels(cache_namespace, "miss").inc()
+            if takes_session:
+                # The session belongs to this caller, so only this caller uses it
+                return await load(key, args, kwargs)
+            # Execute function once for all concurrent callers
+            return await asyncio.shield(start_load(key, args, kwargs))
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
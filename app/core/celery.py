@@ -1,23 +1,115 @@
-from celery import Celery
+import logging
+from typing import Optional
 
+from celery import Celery, Task
+from celery.signals import worker_process_init, worker_process_shutdown
+from kombu.serialization import register
+
+from app.core.async_bridge import bridge
+from app.core.payloads import has_payload_refs, resolve_payloads
+from app.core.serialization import Serializer
 from app.core.settings import settings
 
+logger = logging.getLogger(__name__)
+
+RESULT_POLICIES = ("ignore", "ttl", "stored")
+
+# Compact task and result encoding: the cache codec (msgpack when installed)
+# with compression above CELERY_COMPRESSION_MIN_BYTES
+_compact = Serializer(
+    settings.CELERY_CODEC,
+    settings.CELERY_COMPRESSION,
+    settings.CELERY_COMPRESSION_MIN_BYTES,
+)
+register(
+    "compact",
+    _compact.dumps,
+    _compact.loads,
+    content_type="application/x-compact",
+    content_encoding="binary",
+)
+
+
+class PolicyTask(Task):
+    """Task base with a per-task result policy.
+
+    Pass ``result_policy`` to ``celery_app.task``: ``ignore`` stores nothing,
+    ``ttl`` stores the result for ``result_ttl`` seconds and ``stored`` keeps
+    it for ``result_expires`` and also records the STARTED state. Explicit
+    ``ignore_result`` or ``track_started`` options override the policy.
+    Callers can only wait on tasks whose results are stored.
+    """
+
+    result_policy: str = settings.CELERY_RESULT_POLICY
+    result_ttl: Optional[int] = None
+
+    @classmethod
+    def bind(cls, app):
+        # Binding fills unset options from the app's config, so note which
+        # ones were passed to celery_app.task before that happens
+        if "_explicit_options" not in cls.__dict__:
+            cls._explicit_options = {
+                name for name in ("ignore_result", "track_started") if cls.__dict__.get(name) is not None
+            }
+        return super().bind(app)
+
+    @classmethod
+    def on_bound(cls, app):
+        if cls.result_policy not in RESULT_POLICIES:
+            raise ValueError(f"Unknown result policy {cls.result_policy} for task {cls.name}")
+        if "ignore_result" not in cls._explicit_options:
+            cls.ignore_result = cls.result_policy == "ignore"
+        if "track_started" not in cls._explicit_options:
+            # STARTED is an extra backend write, only worth it for results someone reads
+            cls.track_started = cls.result_policy == "stored"
+
+    def __call__(self, *args, **kwargs):
+        if has_payload_refs(args, kwargs):
+            args, kwargs = bridge.run(resolve_payloads(args, kwargs))
+        return super().__call__(*args, **kwargs)
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        if self.result_policy != "ttl" or not hasattr(self.backend, "expire"):
+            return
+        try:
+            self.backend.expire(
+                self.backend.get_key_for_task(task_id),
+                self.result_ttl or settings.CELERY_RESULT_TTL,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to set result TTL for task {task_id}: {e}")
+
+
 celery_app = Celery(
     "app",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
     include=["app.tasks"],
+    task_cls=PolicyTask,
 )
 
 # Optional configuration
 celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
+    task_serializer=settings.CELERY_SERIALIZER,
+    # Accept both encodings so workers and publishers can be switched one at a time
+    accept_content=["json", "compact"],
+    result_serializer=settings.CELERY_SERIALIZER,
+    result_accept_content=["json", "compact"],
     timezone="UTC",
     enable_utc=True,
-    task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     worker_max_tasks_per_child=1000,
     broker_connection_retry_on_startup=True,
-) 
\ No newline at end of file
+)
+
+
+@worker_process_init.connect
+def start_async_bridge(**kwargs):
+    """Give each worker process one event loop and shared clients for async tasks."""
+    bridge.start()
+
+
+@worker_process_shutdown.connect
+def stop_async_bridge(**kwargs):
+    """Close the worker's shared clients and event loop."""
+    bridge.stop()
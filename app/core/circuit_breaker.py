@@ -1,87 +1,357 @@
-from datetime import datetime, timedelta
-from typing import Any, Callable, Optional, TypeVar
-
-from tenacity import (
-    RetryError,
-    retry,
-    stop_after_attempt,
-    wait_exponential,
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple, TypeVar
+
+from app.core.bulkhead import Bulkhead, BulkheadFullError, get_bulkhead
+from app.core.metrics import (
+    CIRCUIT_BREAKER_CALLS,
+    CIRCUIT_BREAKER_FAILURE_RATE,
+    CIRCUIT_BREAKER_SLOW_CALL_RATE,
+    CIRCUIT_BREAKER_STATE,
 )
+from app.core.retry import get_retry_policy
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
 
+STATES = ("closed", "open", "half-open")
+
+
+class RedisBreakerBackend:
+    """Shares breaker call counts and open state across processes through Redis.
+
+    Outcomes are counted in ``buckets`` wall-clock buckets per window, since
+    monotonic clocks are not comparable between hosts. Whoever trips a breaker
+    sets an ``open`` key that expires after the reset timeout, which opens the
+    breaker everywhere. Closing only clears that key; the counts age out.
+    """
+
+    def __init__(self, client: Any, prefix: str = "breaker", buckets: int = 10):
+        self.client = client
+        self.prefix = prefix
+        self.buckets = buckets
+
+    def _bucket_keys(self, name: str, window: int, since: Optional[float] = None) -> List[str]:
+        width = max(1, window // self.buckets)
+        current = int(time.time()) // width
+        first = current - self.buckets + 1
+        if since is not None:
+            first = max(first, int(since) // width + 1)
+        return [f"{self.prefix}:{name}:{bucket}" for bucket in range(first, current + 1)]
+
+    async def sync(
+        self,
+        name: str,
+        window: int,
+        calls: int = 0,
+        failures: int = 0,
+        slow: int = 0,
+        since: Optional[float] = None,
+    ) -> Tuple[int, int, int, float]:
+        """Add this process's unsynced counts and read the fleet's, in one round trip.
+
+        Returns calls, failures and slow calls over the window, counting only
+        buckets that start after the wall-clock time ``since`` if given, and
+        seconds until the open state ends.
+        """
+        current = self._bucket_keys(name, window)[-1]
+        keys = self._bucket_keys(name, window, since)
+        async with self.client.pipeline(transaction=False) as pipe:
+            if calls:
+                pipe.hincrby(current, "calls", calls)
+                pipe.hincrby(current, "failures", failures)
+                pipe.hincrby(current, "slow", slow)
+                pipe.expire(current, window * 2)
+            for key in keys:
+                pipe.hmget(key, "calls", "failures", "slow")
+            pipe.pttl(f"{self.prefix}:{name}:open")
+            results = await pipe.execute()
+        *buckets, open_ms = results[-len(keys) - 1:]
+        totals = [sum(int(value or 0) for value in column) for column in zip(*buckets)]
+        return totals[0], totals[1], totals[2], max(open_ms, 0) / 1000
+
+    async def open(self, name: str, reset_timeout: float) -> None:
+        await self.client.set(f"{self.prefix}:{name}:open", 1, px=int(reset_timeout * 1000), nx=True)
+
+    async def close(self, name: str) -> None:
+        await self.client.delete(f"{self.prefix}:{name}:open")
+
 
 class CircuitBreaker:
-    """Circuit breaker pattern implementation."""
+    """Circuit breaker pattern implementation.
+
+    Calls are recorded in one-second buckets over a rolling ``window``. Once
+    at least ``minimum_calls`` were made, the breaker opens when the failure
+    rate or the rate of calls slower than ``slow_call_duration`` reaches its
+    threshold. After ``reset_timeout`` it lets ``half_open_max_calls`` trial
+    calls through: all must succeed to close it, any failure reopens it.
+    Admitted calls then take a slot in the dependency's ``bulkhead``, if any.
+    """
 
     def __init__(
         self,
-        failure_threshold: int = 5,
-        reset_timeout: int = 60,
+        name: str = "default",
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 1.0,
+        slow_call_duration: float = 5.0,
+        window: int = 60,
+        minimum_calls: int = 10,
+        reset_timeout: float = 60,
+        half_open_max_calls: int = 3,
         retry_count: int = 3,
+        backend: Optional[RedisBreakerBackend] = None,
+        sync_interval: float = 1.0,
+        bulkhead: Optional[Bulkhead] = None,
     ):
-        self.failure_threshold = failure_threshold
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.window = window
+        self.minimum_calls = minimum_calls
         self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
         self.retry_count = retry_count
-        self.failures = 0
-        self.last_failure_time: Optional[datetime] = None
-        self.state = "closed"  # closed, open, half-open
+        self.bulkhead = bulkhead
+        # Shared state is read, and this process's outcomes added to it, in
+        # the background at most every sync_interval, so calls only ever touch
+        # the local copy
+        self.backend = backend
+        self.sync_interval = sync_interval
+        self._synced_at = float("-inf")
+        # Calls, failures and slow calls not yet added to the shared counts
+        self._unsynced = [0, 0, 0]
+        # Wall-clock time of the last close; shared counts from before it led
+        # to the open state and are ignored while they age out
+        self._counting_since: Optional[float] = None
+        self._background: Set[asyncio.Task] = set()
+        # [second, calls, failures, slow calls]
+        self._buckets: Deque[List[int]] = deque()
+        self.opened_at: Optional[float] = None
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+        # Bumped on every state change so stale shared reads are discarded
+        self._generation = 0
+        self.state = "closed"
+        self._set_state("closed")
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(f"Circuit breaker {self.name} is now {state}")
+            self._generation += 1
+        self.state = state
+        for name in STATES:
+            CIRCUIT_BREAKER_STATE.labels(self.name, name).set(1 if name == state else 0)
+
+    def _trim(self, now: float) -> None:
+        oldest = int(now) - self.window
+        while self._buckets and self._buckets[0][0] <= oldest:
+            self._buckets.popleft()
+
+    def rates(self) -> Dict[str, float]:
+        """Return call count, failure rate and slow-call rate over the window."""
+        self._trim(time.monotonic())
+        calls = sum(bucket[1] for bucket in self._buckets)
+        failures = sum(bucket[2] for bucket in self._buckets)
+        slow = sum(bucket[3] for bucket in self._buckets)
+        return {
+            "calls": calls,
+            "failure_rate": failures / calls if calls else 0.0,
+            "slow_call_rate": slow / calls if calls else 0.0,
+        }
+
+    def _spawn(self, coro: Any) -> None:
+        task = asyncio.create_task(self._shared(coro))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _shared(self, coro: Any) -> None:
+        # Redis trouble must never fail the call being protected
+        try:
+            await coro
+        except Exception as e:
+            logger.debug(f"Shared state for circuit breaker {self.name} unavailable: {e}")
+
+    async def _sync(self, generation: int) -> None:
+        unsynced, self._unsynced = self._unsynced, [0, 0, 0]
+        try:
+            calls, failures, slow, open_for = await self.backend.sync(
+                self.name, self.window, *unsynced, since=self._counting_since
+            )
+        except Exception:
+            # Keep the counts for the next sync
+            self._unsynced = [a + b for a, b in zip(self._unsynced, unsynced)]
+            raise
+        if self.state != "closed" or self._generation != generation:
+            return
+        if open_for > 0:
+            # Opened elsewhere: go half-open when the shared open state ends
+            self.opened_at = time.monotonic() - self.reset_timeout + open_for
+            self._set_state("open")
+        elif calls >= self.minimum_calls and (
+            failures / calls >= self.failure_rate_threshold
+            or slow / calls >= self.slow_call_rate_threshold
+        ):
+            self._open()
+
+    def _maybe_sync(self) -> None:
+        now = time.monotonic()
+        if self.backend is not None and now - self._synced_at >= self.sync_interval:
+            self._synced_at = now
+            self._spawn(self._sync(self._generation))
+
+    def _open(self) -> None:
+        self.opened_at = time.monotonic()
+        self._set_state("open")
+        if self.backend is not None:
+            self._spawn(self.backend.open(self.name, self.reset_timeout))
+
+    def _close(self) -> None:
+        self._buckets.clear()
+        self.opened_at = None
+        self._set_state("closed")
+        if self.backend is not None:
+            # Other processes still count into the shared window, so only the
+            # open state is cleared
+            self._counting_since = time.time()
+            self._spawn(self.backend.close(self.name))
 
     def _can_execute(self) -> bool:
-        """Check if the circuit breaker can execute the operation."""
-        if self.state == "closed":
-            return True
-        
+        """Check if the circuit breaker can execute the operation, reserving a trial slot if half-open."""
+        self._maybe_sync()
         if self.state == "open":
-            if self.last_failure_time is None:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
                 return False
-            
-            if datetime.now() - self.last_failure_time > timedelta(seconds=self.reset_timeout):
-                self.state = "half-open"
-                return True
-            
-            return False
-        
-        # half-open state
+            self._half_open_calls = 0
+            self._half_open_successes = 0
+            self._set_state("half-open")
+
+        if self.state == "half-open":
+            if self._half_open_calls >= self.half_open_max_calls:
+                return False
+            self._half_open_calls += 1
+
         return True
 
-    def _record_failure(self) -> None:
-        """Record a failure and update the circuit breaker state."""
-        self.failures += 1
-        self.last_failure_time = datetime.now()
-        
-        if self.failures >= self.failure_threshold:
-            self.state = "open"
-
-    def _record_success(self) -> None:
-        """Record a success and reset the circuit breaker."""
-        self.failures = 0
-        self.state = "closed"
+    def _record(self, failed: bool, duration: float) -> None:
+        """Record a call outcome and update the circuit breaker state."""
+        slow = duration >= self.slow_call_duration
+        CIRCUIT_BREAKER_CALLS.labels(self.name, "failure" if failed else "success").inc()
 
-    async def execute(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
-        """Execute a function with circuit breaker protection."""
-        if not self._can_execute():
-            raise CircuitBreakerError("Circuit breaker is open")
+        if self.state == "half-open":
+            if failed or slow:
+                self._open()
+            else:
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self._close()
+            return
 
-        @retry(
-            stop=stop_after_attempt(self.retry_count),
-            wait=wait_exponential(multiplier=1, min=4, max=10),
-        )
-        async def _execute() -> Any:
+        if self.backend is not None:
+            self._unsynced[0] += 1
+            self._unsynced[1] += failed
+            self._unsynced[2] += slow
+
+        now = time.monotonic()
+        self._trim(now)
+        second = int(now)
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0, 0])
+        bucket = self._buckets[-1]
+        bucket[1] += 1
+        bucket[2] += failed
+        bucket[3] += slow
+
+        rates = self.rates()
+        CIRCUIT_BREAKER_FAILURE_RATE.labels(self.name).set(rates["failure_rate"])
+        CIRCUIT_BREAKER_SLOW_CALL_RATE.labels(self.name).set(rates["slow_call_rate"])
+        if self.state == "closed" and rates["calls"] >= self.minimum_calls and (
+            rates["failure_rate"] >= self.failure_rate_threshold
+            or rates["slow_call_rate"] >= self.slow_call_rate_threshold
+        ):
+            self._open()
+
+    async def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Make a single protected call, without retries."""
+        if not self._can_execute():
+            CIRCUIT_BREAKER_CALLS.labels(self.name, "rejected").inc()
+            raise CircuitBreakerError(f"Circuit breaker {self.name} is {self.state}")
+        if self.bulkhead is not None:
             try:
-                result = await func(*args, **kwargs)
-                self._record_success()
-                return result
-            except Exception as e:
-                self._record_failure()
-                raise e
+                await self.bulkhead.acquire()
+            except BaseException:
+                # Hand back the trial slot reserved for this call
+                if self.state == "half-open":
+                    self._half_open_calls -= 1
+                raise
+
+        start = time.monotonic()
+        failed = True
+        try:
+            result = await func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            # Cancelled calls (deadlines, timeouts, disconnects) count as
+            # failures too, so a hanging dependency trips the breaker and a
+            # half-open trial slot is always resolved
+            duration = time.monotonic() - start
+            if self.bulkhead is not None:
+                self.bulkhead.release(duration, failed)
+            self._record(failed, duration)
 
+    async def execute(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Execute a function with circuit breaker protection and budgeted retries."""
+        policy = get_retry_policy(
+            self.name,
+            max_attempts=self.retry_count,
+            no_retry_on=(CircuitBreakerError, BulkheadFullError),
+        )
         try:
-            return await _execute()
-        except RetryError as e:
-            raise CircuitBreakerError(f"Operation failed after {self.retry_count} retries") from e
+            return await policy.run(self.call, func, *args, **kwargs)
+        except (CircuitBreakerError, BulkheadFullError):
+            raise
+        except Exception as e:
+            raise CircuitBreakerError(f"Operation {self.name} failed: {e}") from e
 
 
 class CircuitBreakerError(Exception):
     """Circuit breaker specific exception."""
-    pass 
\ No newline at end of file
+    pass
+
+
+# One breaker per downstream dependency, shared by everything calling it
+breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, **config: Any) -> CircuitBreaker:
+    """Return the named breaker, creating it from settings and ``config`` on first use."""
+    breaker = breakers.get(name)
+    if breaker is None:
+        options = {
+            "failure_rate_threshold": settings.CIRCUIT_BREAKER_FAILURE_RATE,
+            "slow_call_rate_threshold": settings.CIRCUIT_BREAKER_SLOW_CALL_RATE,
+            "slow_call_duration": settings.CIRCUIT_BREAKER_SLOW_CALL_DURATION,
+            "window": settings.CIRCUIT_BREAKER_WINDOW,
+            "minimum_calls": settings.CIRCUIT_BREAKER_MINIMUM_CALLS,
+            "reset_timeout": settings.CIRCUIT_BREAKER_RESET_TIMEOUT,
+            "half_open_max_calls": settings.CIRCUIT_BREAKER_HALF_OPEN_CALLS,
+            "retry_count": settings.EXTERNAL_SERVICE_RETRIES,
+            "sync_interval": settings.CIRCUIT_BREAKER_SYNC_INTERVAL,
+        }
+        if settings.BULKHEAD_ENABLED:
+            options["bulkhead"] = get_bulkhead(name)
+        if settings.CIRCUIT_BREAKER_SHARED and not settings.REDIS_FALLBACK:
+            from app.core.cache import cache
+
+            options["backend"] = RedisBreakerBackend(
+                cache.redis_client,
+                prefix=f"{settings.CACHE_KEY_PREFIX}:breaker",
+            )
+        options.update(config)
+        breaker = breakers[name] = CircuitBreaker(name, **options)
+    return breaker
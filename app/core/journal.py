@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (row id, task id, task name, args, kwargs)
+SpilledTask = Tuple[int, str, str, list, dict]
+
+
+class SpillJournal:
+    """Append-only SQLite journal for tasks that could not be published.
+
+    Appends made within ``commit_interval`` seconds of each other are written
+    in one transaction (group commit), so a burst of spills costs one fsync
+    instead of one per task. Rows stay in the journal until they are acked
+    after a successful republish.
+
+    Several processes may share one journal file, each running a drainer.
+    Drainers claim rows for ``lease`` seconds before publishing them, so a
+    row is republished by one process only; rows claimed by a drainer that
+    died become claimable again once the lease runs out.
+    """
+
+    def __init__(self, path: str, commit_interval: float = 0.005, max_batch: int = 500):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self._conn: Optional[sqlite3.Connection] = None
+        # sqlite3 connections are not safe for concurrent use across threads
+        self._lock = threading.Lock()
+        self._buffer: List[Tuple[Tuple[str, str, str, float], asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL with NORMAL survives process crashes; only power loss can drop the last commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS spilled_tasks ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "task_id TEXT NOT NULL, "
+                "name TEXT NOT NULL, "
+                "payload TEXT NOT NULL, "
+                "created_at REAL NOT NULL, "
+                "claimed_until REAL)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(spilled_tasks)")]
+            if "claimed_until" not in columns:
+                # Journals written before rows could be claimed
+                conn.execute("ALTER TABLE spilled_tasks ADD COLUMN claimed_until REAL")
+            self._conn = conn
+        return self._conn
+
+    def _write(self, rows: List[Tuple[str, str, str, float]]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT INTO spilled_tasks (task_id, name, payload, created_at) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.commit_interval)
+        await self._flush()
+
+    async def _flush(self) -> None:
+        self._flusher = None
+        pending, self._buffer = self._buffer, []
+        if not pending:
+            return
+        try:
+            await asyncio.to_thread(self._write, [row for row, _ in pending])
+        except Exception as e:
+            logger.error(f"Failed to write {len(pending)} tasks to the spill journal: {e}")
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in pending:
+            if not future.done():
+                future.set_result(None)
+
+    async def append(self, task_id: str, name: str, args: tuple, kwargs: dict) -> None:
+        """Add a task to the journal, returning once it is committed."""
+        payload = json.dumps({"args": list(args), "kwargs": kwargs})
+        future = asyncio.get_running_loop().create_future()
+        self._buffer.append(((task_id, name, payload, time.time()), future))
+        if len(self._buffer) >= self.max_batch:
+            if self._flusher is not None:
+                self._flusher.cancel()
+            await self._flush()
+        elif self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_later())
+        await future
+
+    def _claim(self, limit: int, lease: float) -> List[SpilledTask]:
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            # IMMEDIATE takes the write lock up front, so concurrent drainers
+            # in other processes can't select the same rows
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "UPDATE spilled_tasks SET claimed_until = ? WHERE id IN ("
+                    "SELECT id FROM spilled_tasks WHERE claimed_until IS NULL OR claimed_until < ? "
+                    "ORDER BY id LIMIT ?) RETURNING id, task_id, name, payload",
+                    (now + lease, now, limit),
+                ).fetchall()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        spilled = []
+        for row_id, task_id, name, payload in sorted(rows):
+            data = json.loads(payload)
+            spilled.append((row_id, task_id, name, data["args"], data["kwargs"]))
+        return spilled
+
+    async def claim(self, limit: int, lease: float = 60.0) -> List[SpilledTask]:
+        """Claim up to ``limit`` of the oldest unclaimed tasks for ``lease`` seconds."""
+        return await asyncio.to_thread(self._claim, limit, lease)
+
+    def _release(self, row_ids: List[int]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            conn.executemany(
+                "UPDATE spilled_tasks SET claimed_until = NULL WHERE id = ?",
+                [(row_id,) for row_id in row_ids],
+            )
+            conn.execute("COMMIT")
+
+    async def release(self, row_ids: List[int]) -> None:
+        """Hand claimed tasks back, e.g. after a failed republish."""
+        if row_ids:
+            await asyncio.to_thread(self._release, row_ids)
+
+    def _ack(self, row_ids: List[int]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            conn.executemany("DELETE FROM spilled_tasks WHERE id = ?", [(row_id,) for row_id in row_ids])
+            conn.execute("COMMIT")
+
+    async def ack(self, row_ids: List[int]) -> None:
+        """Remove republished tasks from the journal."""
+        if row_ids:
+            await asyncio.to_thread(self._ack, row_ids)
+
+    def _count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM spilled_tasks").fetchone()[0]
+
+    async def count(self) -> int:
+        """Return the number of journaled tasks."""
+        return await asyncio.to_thread(self._count)
+
+    async def close(self) -> None:
+        """Flush buffered appends and close the database."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+        await self._flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory footprint of a value in bytes."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class MemoryCache:
+    """Bounded in-process cache with per-key TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sweep_interval: float = 60,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        # key -> (value, expires_at, size); ordered from least to most recently used
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._sweeper: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and not self._is_expired(entry)
+
+    @staticmethod
+    def _is_expired(entry: Tuple[Any, Optional[float], int]) -> bool:
+        expires_at = entry[1]
+        return expires_at is not None and expires_at <= time.monotonic()
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get value from cache, expiring it lazily."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        if self._is_expired(entry):
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: str, value: Any, expire: Optional[float] = None) -> None:
+        """Set value in cache with an optional TTL in seconds."""
+        if key in self._data:
+            self._remove(key)
+
+        size = estimate_size(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            logger.warning(f"Value for cache key {key} exceeds memory budget, not cached")
+            return
+
+        expires_at = time.monotonic() + expire if expire else None
+        self._data[key] = (value, expires_at, size)
+        self._bytes += size
+        self._evict()
+
+    def delete(self, key: str) -> bool:
+        """Delete value from cache."""
+        if key not in self._data:
+            return False
+        self._remove(key)
+        return True
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        """Remove a key and return its value if it has not expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        self._remove(key)
+        return default if self._is_expired(entry) else entry[0]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._data.clear()
+        self._bytes = 0
+
+    def _evict(self) -> None:
+        """Evict least recently used entries until the cache is within budget."""
+        while self._data and (
+            (self.max_entries and len(self._data) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
+
+    def sweep(self) -> int:
+        """Remove all expired entries and return how many were dropped."""
+        now = time.monotonic()
+        expired = [
+            key for key, (_, expires_at, _) in self._data.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache counters."""
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.debug(f"Swept {removed} expired cache entries")
+            except Exception as e:
+                logger.error(f"Memory cache sweep error: {e}")
+
+    def start(self) -> None:
+        """Start the periodic expiry sweep on the running event loop."""
+        if self._sweeper is None and self.sweep_interval:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        """Stop the periodic expiry sweep."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
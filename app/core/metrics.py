@@ -0,0 +1,193 @@
+from typing import Callable, Dict, Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from app.core.memory_cache import MemoryCache
+
+# Cache
+CACHE_BACKEND_MODE = Gauge(
+    "cache_backend_mode",
+    "Cache backend currently serving requests (1 for the active backend)",
+    ["backend"],
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by key namespace, backend and result",
+    ["namespace", "backend", "result"],
+)
+CACHE_OPERATION_SECONDS = Histogram(
+    "cache_operation_seconds",
+    "Cache operation latency",
+    ["operation", "namespace", "backend"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+CACHE_PAYLOAD_BYTES = Histogram(
+    "cache_payload_bytes",
+    "Serialized cache payload size",
+    ["namespace", "direction"],
+    buckets=(64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+CACHE_FALLBACK_ACTIVATIONS = Counter(
+    "cache_fallback_activations_total",
+    "Cache operations served from memory after a Redis error",
+    ["operation"],
+)
+CACHED_CALLS = Counter(
+    "cached_calls_total",
+    "Calls to cached functions by namespace and result (hit, stale or miss)",
+    ["namespace", "result"],
+)
+CACHED_LOAD_SECONDS = Histogram(
+    "cached_load_seconds",
+    "Time spent computing values for cached functions on a miss",
+    ["namespace"],
+)
+
+# Database connection pools
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Database connections currently checked out",
+    ["pool"],
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond the pool size (negative while the pool isn't full)",
+    ["pool"],
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+DB_POOL_PINGS = Counter(
+    "db_pool_pings_total",
+    "Pre-ping checks of idle connections by result (ok or disconnected)",
+    ["pool", "result"],
+)
+DB_REQUESTS_SHED = Counter(
+    "db_requests_shed_total",
+    "Requests answered with 503 because no database connection was available in time",
+    ["reason"],
+)
+
+# Fallback task queue
+TASK_QUEUE_DEPTH = Gauge(
+    "task_fallback_queue_depth",
+    "Tasks waiting in the in-memory fallback queue",
+    ["lane"],
+)
+TASK_WAIT_SECONDS = Histogram(
+    "task_fallback_wait_seconds",
+    "Time fallback tasks spend queued, including rate limiting, before they start",
+    ["lane", "task"],
+)
+TASK_DURATION_SECONDS = Histogram(
+    "task_fallback_duration_seconds",
+    "Fallback task execution time",
+    ["task"],
+)
+TASK_RESULTS = Counter(
+    "task_fallback_results_total",
+    "Fallback task outcomes",
+    ["task", "status"],
+)
+TASK_SPILLED = Counter(
+    "task_spilled_total",
+    "Tasks written to the spill journal because the broker was unavailable",
+    ["task"],
+)
+TASK_SPILL_REPUBLISHED = Counter(
+    "task_spill_republished_total",
+    "Spilled tasks republished to the broker",
+    ["task"],
+)
+
+# Circuit breakers
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state (1 for the current state)",
+    ["name", "state"],
+)
+CIRCUIT_BREAKER_FAILURE_RATE = Gauge(
+    "circuit_breaker_failure_rate",
+    "Failure rate over the breaker's rolling window",
+    ["name"],
+)
+CIRCUIT_BREAKER_SLOW_CALL_RATE = Gauge(
+    "circuit_breaker_slow_call_rate",
+    "Slow call rate over the breaker's rolling window",
+    ["name"],
+)
+CIRCUIT_BREAKER_CALLS = Counter(
+    "circuit_breaker_calls_total",
+    "Calls through circuit breakers by result (success, failure or rejected)",
+    ["name", "result"],
+)
+
+# Retries
+RETRIES = Counter(
+    "retries_total",
+    "Retry decisions by dependency: retried, exhausted, deadline_exceeded or budget_exhausted",
+    ["dependency", "result"],
+)
+
+# Bulkheads
+BULKHEAD_LIMIT = Gauge(
+    "bulkhead_limit",
+    "Current concurrency limit per dependency",
+    ["dependency"],
+)
+BULKHEAD_INFLIGHT = Gauge(
+    "bulkhead_inflight",
+    "Calls currently running per dependency",
+    ["dependency"],
+)
+BULKHEAD_QUEUE_WAIT_SECONDS = Histogram(
+    "bulkhead_queue_wait_seconds",
+    "Time calls spend queued for a bulkhead slot",
+    ["dependency"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+BULKHEAD_REJECTED = Counter(
+    "bulkhead_rejected_total",
+    "Calls rejected by bulkheads by reason (queue_full or queue_timeout)",
+    ["dependency", "reason"],
+)
+
+# Outbound HTTP; no host label, since clients may be sent arbitrary URLs
+# and the client name already identifies the dependency
+HTTP_CLIENT_REQUEST_SECONDS = Histogram(
+    "http_client_request_seconds",
+    "Outbound HTTP request latency by client, method and status",
+    ["client", "method", "status"],
+)
+
+
+class MemoryCacheCollector(Collector):
+    """Exports MemoryCache counters, looked up lazily so caches may come and go."""
+
+    def __init__(self, caches: Callable[[], Dict[str, Optional[MemoryCache]]]):
+        self.caches = caches
+
+    def collect(self) -> Iterator:
+        entries = GaugeMetricFamily("cache_memory_entries", "Entries held in memory", labels=["cache"])
+        size = GaugeMetricFamily("cache_memory_bytes", "Estimated bytes held in memory", labels=["cache"])
+        counters = {
+            name: CounterMetricFamily(f"cache_memory_{name}", f"In-memory cache {name}", labels=["cache"])
+            for name in ("hits", "misses", "evictions", "expirations")
+        }
+        for label, memory_cache in self.caches().items():
+            if memory_cache is None:
+                continue
+            stats = memory_cache.stats()
+            entries.add_metric([label], stats["entries"])
+            size.add_metric([label], stats["bytes"])
+            for name, family in counters.items():
+                family.add_metric([label], stats[name])
+
+        yield entries
+        yield size
+        yield from counters.values()
@@ -3,8 +3,11 @@ from typing import Callable
 
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp
 from structlog import get_logger
 
+from app.core.retry import deadline
+
 logger = get_logger()
 
 
@@ -22,4 +25,21 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             process_time=process_time,
         )
 
-        return response 
\ No newline at end of file
+        return response
+
+
+class RequestDeadlineMiddleware(BaseHTTPMiddleware):
+    """Gives each request a time budget.
+
+    Retrying calls made while handling the request, and the database pool and
+    bulkhead waits they include, stop once ``seconds`` have passed instead of
+    outliving a client that has already given up.
+    """
+
+    def __init__(self, app: ASGIApp, seconds: float):
+        super().__init__(app)
+        self.seconds = seconds
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        with deadline(self.seconds):
+            return await call_next(request)
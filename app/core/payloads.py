@@ -0,0 +1,46 @@
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.cache import cache, make_key
+from app.core.settings import settings
+
+# Marker for task arguments stored in the cache instead of the broker message
+REF_KEY = "__payload_ref__"
+
+
+def is_payload_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and REF_KEY in value
+
+
+async def store_payload(value: Any, expire: Optional[int] = None) -> Dict[str, str]:
+    """Store a large task argument in the cache and return a reference to pass instead.
+
+    Workers only see the value if they share the cache, so this needs Redis
+    unless tasks run in-process in fallback mode.
+    """
+    key = make_key("payload", uuid.uuid4().hex)
+    await cache.set(key, value, expire or settings.CELERY_PAYLOAD_TTL)
+    return {REF_KEY: key}
+
+
+async def _load(ref: Dict[str, str]) -> Any:
+    value = await cache.get(ref[REF_KEY])
+    if value is None:
+        raise LookupError(f"Task payload {ref[REF_KEY]} is missing or expired")
+    return value
+
+
+def has_payload_refs(args: tuple, kwargs: dict) -> bool:
+    return any(is_payload_ref(value) for value in (*args, *kwargs.values()))
+
+
+async def resolve_payloads(args: tuple, kwargs: dict) -> Tuple[tuple, dict]:
+    """Replace payload references in task arguments with the stored values."""
+    if not has_payload_refs(args, kwargs):
+        return args, kwargs
+    args = tuple([await _load(value) if is_payload_ref(value) else value for value in args])
+    kwargs = {
+        name: await _load(value) if is_payload_ref(value) else value
+        for name, value in kwargs.items()
+    }
+    return args, kwargs
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Set
+
+from app.core.cache import cache
+from app.core.http import close_http_clients
+from app.core.tasks import (
+    drain_spill_journal,
+    load_task_modules,
+    process_fallback_queue,
+    shutdown_executors,
+    task_queue,
+)
+from app.db.session import close_db, connect_db
+
+logger = logging.getLogger(__name__)
+
+
+class Resources:
+    """Process-wide resources opened on application startup and closed on shutdown.
+
+    Nothing here connects at import time. ``start`` opens the database, Redis
+    and broker connections concurrently, so cold start costs the slowest of
+    them rather than their sum, then starts the background loops. ``close``
+    stops the loops and releases everything, logging rather than raising so
+    one failure doesn't leak the rest.
+    """
+
+    def __init__(self):
+        self.started = False
+        self._background: Set[asyncio.Task] = set()
+
+    def _spawn(self, coro: Awaitable) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def start(self) -> None:
+        """Open connections and start background work."""
+        if self.started:
+            return
+        start = time.monotonic()
+
+        # Register tasks before any can be dispatched
+        load_task_modules()
+
+        await asyncio.gather(connect_db(), cache.connect(), task_queue.connect())
+
+        # In-process cache maintenance and cross-worker invalidation
+        await cache.start()
+
+        # Fallback queue workers idle until a task is queued, which also
+        # happens when Celery is configured but publishing fails
+        self._spawn(process_fallback_queue())
+
+        # Hand tasks spilled during broker outages back to Celery
+        if task_queue.journal is not None and not task_queue.use_fallback:
+            self._spawn(drain_spill_journal())
+
+        self.started = True
+        logger.info(f"Started application resources in {time.monotonic() - start:.3f}s")
+
+    async def _close(self, name: str, close: Callable[[], Awaitable]) -> None:
+        try:
+            await close()
+        except Exception as e:
+            logger.warning(f"Error closing {name}: {e}")
+
+    async def close(self) -> None:
+        """Stop background work and release connections."""
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+
+        # Stop fallback task thread and process pools
+        shutdown_executors()
+
+        await asyncio.gather(
+            self._close("database", close_db),
+            self._close("cache", cache.close),
+            # Outbound HTTP clients, including those opened by fallback tasks
+            self._close("http clients", close_http_clients),
+            # Flush pending spill journal writes
+            self._close("task queue", task_queue.close),
+        )
+        self.started = False
+
+
+resources = Resources()
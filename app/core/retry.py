@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Type
+
+from app.core.metrics import RETRIES
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Absolute time.monotonic() deadline for the current request or job
+_deadline: ContextVar[Optional[float]] = ContextVar("retry_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Bound every retrying call made inside the block to ``seconds`` from now."""
+    current = _deadline.get()
+    new = time.monotonic() + seconds
+    token = _deadline.set(new if current is None else min(current, new))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
+class RetryBudget:
+    """Caps retries for one dependency at a fraction of its traffic.
+
+    Every call deposits ``ratio`` tokens and every retry spends one, so during
+    an outage retries add at most ``ratio`` extra load. ``min_per_second``
+    tokens also trickle in so low-traffic dependencies can still retry.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self.updated) * self.min_per_second)
+        self.updated = now
+
+    def record_call(self) -> None:
+        self._refill()
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class RetryPolicy:
+    """Retries a coroutine with full-jitter exponential backoff.
+
+    Retries stop when ``max_attempts`` is reached, when the dependency's retry
+    budget is spent, or when the next attempt could not start before the
+    deadline (from ``timeout`` or an enclosing ``deadline()`` block, which
+    RequestDeadlineMiddleware opens for every request). Each attempt is also
+    cut off at the deadline. With ``max_attempts=None`` only the deadline
+    stops retries, so calls without one are refused.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: Optional[int] = 3,
+        base_delay: float = 0.1,
+        max_delay: float = 2.0,
+        retry_on: Tuple[Type[Exception], ...] = (Exception,),
+        no_retry_on: Tuple[Type[Exception], ...] = (),
+        budget: Optional[RetryBudget] = None,
+    ):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.no_retry_on = no_retry_on
+        self.budget = budget
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number ``attempt`` (starting at 1)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _should_retry(self, error: Exception) -> bool:
+        return isinstance(error, self.retry_on) and not isinstance(error, self.no_retry_on)
+
+    async def run(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Call ``func`` until it succeeds or retrying is no longer allowed."""
+        until = _deadline.get()
+        if timeout is not None:
+            until = min(until, time.monotonic() + timeout) if until is not None else time.monotonic() + timeout
+        if self.max_attempts is None and until is None:
+            raise ValueError(f"Retry policy {self.name} has no attempt limit, so it needs a timeout or deadline")
+        if self.budget is not None:
+            self.budget.record_call()
+
+        attempt = 1
+        while True:
+            try:
+                if until is None:
+                    return await func(*args, **kwargs)
+                return await asyncio.wait_for(func(*args, **kwargs), max(until - time.monotonic(), 0))
+            except Exception as e:
+                if not self._should_retry(e):
+                    raise
+                if self.max_attempts is not None and attempt >= self.max_attempts:
+                    RETRIES.labels(self.name, "exhausted").inc()
+                    raise
+                delay = self.backoff(attempt)
+                if until is not None and time.monotonic() + delay >= until:
+                    RETRIES.labels(self.name, "deadline_exceeded").inc()
+                    raise
+                if self.budget is not None and not self.budget.try_spend():
+                    RETRIES.labels(self.name, "budget_exhausted").inc()
+                    raise
+                RETRIES.labels(self.name, "retried").inc()
+                logger.warning(f"Retrying {self.name} in {delay:.2f}s after attempt {attempt} failed: {e}")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+# One policy, and so one retry budget, per dependency
+policies: Dict[str, RetryPolicy] = {}
+
+
+def get_retry_policy(name: str, **config: Any) -> RetryPolicy:
+    """Return the named policy, creating it from settings and ``config`` on first use."""
+    policy = policies.get(name)
+    if policy is None:
+        options: Dict[str, Any] = {
+            "max_attempts": settings.RETRY_MAX_ATTEMPTS,
+            "base_delay": settings.RETRY_BASE_DELAY,
+            "max_delay": settings.RETRY_MAX_DELAY,
+            "budget": RetryBudget(settings.RETRY_BUDGET_RATIO, settings.RETRY_BUDGET_MIN_PER_SECOND),
+        }
+        options.update(config)
+        policy = policies[name] = RetryPolicy(name, **options)
+    return policy
+
+
+def retrying(name: str, timeout: Optional[float] = None, **config: Any) -> Callable:
+    """Decorate a coroutine function to run under the named retry policy."""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            policy = get_retry_policy(name, **config)
+            return await policy.run(func, *args, timeout=timeout, **kwargs)
+
+        return wrapper
+    return decorator
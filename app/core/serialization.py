@@ -0,0 +1,192 @@
+import json
+import logging
+import sys
+import zlib
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - optional dependency
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+# Marker key for values that plain JSON/msgpack cannot represent
+TYPE_KEY = "__cache_type__"
+
+
+def _default(value: Any) -> Any:
+    """Encode datetimes and pydantic models as tagged dictionaries."""
+    if isinstance(value, datetime):
+        return {TYPE_KEY: "datetime", "value": value.isoformat()}
+    if isinstance(value, date):
+        return {TYPE_KEY: "date", "value": value.isoformat()}
+    if isinstance(value, BaseModel):
+        cls = type(value)
+        return {
+            TYPE_KEY: "model",
+            "class": f"{cls.__module__}:{cls.__qualname__}",
+            "value": value.model_dump(),
+        }
+    raise TypeError(f"Object of type {type(value).__name__} is not cache serializable")
+
+
+def _resolve_model(path: str) -> Optional[type]:
+    """Find a pydantic model class among already imported modules."""
+    module_name, _, qualname = path.partition(":")
+    target: Any = sys.modules.get(module_name)
+    for attr in qualname.split("."):
+        target = getattr(target, attr, None)
+    if isinstance(target, type) and issubclass(target, BaseModel):
+        return target
+    return None
+
+
+def _object_hook(obj: Dict[str, Any]) -> Any:
+    """Decode tagged dictionaries produced by ``_default``."""
+    kind = obj.get(TYPE_KEY)
+    if kind is None:
+        return obj
+    if kind == "datetime":
+        return datetime.fromisoformat(obj["value"])
+    if kind == "date":
+        return date.fromisoformat(obj["value"])
+    if kind == "model":
+        model = _resolve_model(obj["class"])
+        return model.model_validate(obj["value"]) if model else obj["value"]
+    return obj
+
+
+def _revive(value: Any) -> Any:
+    """Apply ``_object_hook`` bottom-up for decoders without hook support."""
+    if isinstance(value, dict):
+        return _object_hook({k: _revive(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_revive(item) for item in value]
+    return value
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+
+def _json_loads(data: bytes) -> Any:
+    return json.loads(data, object_hook=_object_hook)
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+
+
+def _orjson_loads(data: bytes) -> Any:
+    return _revive(orjson.loads(data))
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, default=_default, datetime=False)
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, object_hook=_object_hook, raw=False)
+
+
+# Codecs and compressors are identified by one header byte each, so a payload
+# always records how it was written and readers can decode any of them.
+CODECS: Dict[str, Tuple[int, Callable[[Any], bytes], Callable[[bytes], Any], bool]] = {
+    "json": (1, _json_dumps, _json_loads, True),
+    "orjson": (2, _orjson_dumps, _orjson_loads, orjson is not None),
+    "msgpack": (3, _msgpack_dumps, _msgpack_loads, msgpack is not None),
+}
+
+COMPRESSORS: Dict[str, Tuple[int, Callable[[bytes], bytes], Callable[[bytes], bytes], bool]] = {
+    "zlib": (1, zlib.compress, zlib.decompress, True),
+    "zstd": (
+        2,
+        lambda data: zstandard.ZstdCompressor().compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+        zstandard is not None,
+    ),
+    "lz4": (
+        3,
+        lambda data: lz4_frame.compress(data),
+        lambda data: lz4_frame.decompress(data),
+        lz4_frame is not None,
+    ),
+}
+
+# Package each codec and compressor needs, named when a payload can't be read
+PACKAGES = {"orjson": "orjson", "msgpack": "msgpack", "zstd": "zstandard", "lz4": "lz4"}
+
+_CODECS_BY_ID = {entry[0]: (name, entry[2], entry[3]) for name, entry in CODECS.items()}
+_COMPRESSORS_BY_ID = {entry[0]: (name, entry[2], entry[3]) for name, entry in COMPRESSORS.items()}
+
+
+def _decoder(name: str, decode: Callable, available: bool) -> Callable:
+    if not available:
+        raise ValueError(f"Cache payload was written with {name}, but {PACKAGES[name]} is not installed")
+    return decode
+
+
+class Serializer:
+    """Encodes cache values to bytes with a pluggable codec and optional compression."""
+
+    def __init__(
+        self,
+        codec: str = "json",
+        compression: Optional[str] = None,
+        compression_min_bytes: int = 1024,
+    ):
+        if codec not in CODECS or not CODECS[codec][3]:
+            logger.warning(f"Cache codec {codec} is unavailable, using json")
+            codec = "json"
+        if compression and (compression not in COMPRESSORS or not COMPRESSORS[compression][3]):
+            logger.warning(f"Cache compression {compression} is unavailable, disabling it")
+            compression = None
+
+        self.codec = codec
+        self.compression = compression
+        self.compression_min_bytes = compression_min_bytes
+        self._codec_id, self._dumps, _, _ = CODECS[codec]
+
+    def dumps(self, value: Any) -> bytes:
+        """Serialize a value, compressing it above the size threshold."""
+        data = self._dumps(value)
+        comp_id = 0
+        if self.compression and len(data) >= self.compression_min_bytes:
+            comp_id, compress, _, _ = COMPRESSORS[self.compression]
+            data = compress(data)
+        return bytes((self._codec_id, comp_id)) + data
+
+    def loads(self, payload: bytes) -> Any:
+        """Deserialize a payload written by any codec."""
+        if isinstance(payload, str):
+            payload = payload.encode()
+        codec_id = payload[0]
+        if codec_id not in _CODECS_BY_ID:
+            # Plain JSON written before payloads carried a header
+            return json.loads(payload)
+        comp_id = payload[1]
+        data = payload[2:]
+        if comp_id:
+            if comp_id not in _COMPRESSORS_BY_ID:
+                raise ValueError(f"Cache payload has unknown compressor id {comp_id}")
+            data = _decoder(*_COMPRESSORS_BY_ID[comp_id])(data)
+        return _decoder(*_CODECS_BY_ID[codec_id])(data)
@@ -40,7 +40,13 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
     DB_FALLBACK: bool = False
-    SQLITE_DB_PATH: str = "sqlite:///./sql_app.db"
+    SQLITE_DB_PATH: str = "sqlite+aiosqlite:///./sql_app.db"
+
+    @validator("SQLITE_DB_PATH")
+    def require_async_sqlite_driver(cls, v: str) -> str:
+        if v.startswith("sqlite:"):
+            raise ValueError("SQLITE_DB_PATH needs an async driver, e.g. sqlite+aiosqlite:///./sql_app.db")
+        return v
     
     @validator("SQLALCHEMY_DATABASE_URI", pre=True)
     def assemble_db_connection(cls, v: Optional[str], values: dict[str, any]) -> any:
@@ -58,6 +64,26 @@ class Settings(BaseSettings):
             host=values.get("POSTGRES_SERVER"),
             path=f"/{values.get('POSTGRES_DB') or ''}",
         )
+
+    # Database connection pool (SQLite uses an unbounded pool and ignores sizing)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    # Check connections before use: always, idle (only after DB_POOL_PRE_PING_IDLE
+    # seconds unused) or never
+    DB_POOL_PRE_PING: str = "idle"
+    DB_POOL_PRE_PING_IDLE: float = 30.0
+    # Requests wait at most this long for a connection, then get a 503 with
+    # Retry-After: DB_SHED_RETRY_AFTER seconds
+    DB_ACQUIRE_TIMEOUT: float = 1.0
+    DB_SHED_RETRY_AFTER: int = 1
+    # Connections opened at startup so the first requests don't pay for them
+    DB_POOL_WARM: int = 2
+    # How long startup waits for the database to accept connections
+    DB_STARTUP_TIMEOUT: float = 30.0
+    # Log every SQL statement
+    DB_ECHO: bool = False
     
     # Redis
     REDIS_HOST: str
@@ -66,6 +92,16 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_URI: Optional[RedisDsn] = None
     REDIS_FALLBACK: bool = False
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 1.0
+    REDIS_SOCKET_TIMEOUT: float = 0.5
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 1.0
+    # Trip to the in-memory cache after this many failures within the window
+    REDIS_FAILURE_THRESHOLD: int = 3
+    REDIS_FAILURE_WINDOW: float = 10.0
+    REDIS_PROBE_INTERVAL: float = 5.0
+    # Keys changed while tripped that are cleared from Redis on recovery
+    REDIS_RECOVERY_MAX_KEYS: int = 10000
     
     @validator("REDIS_URI", pre=True)
     def assemble_redis_connection(cls, v: Optional[str], values: dict[str, any]) -> any:
@@ -83,11 +119,84 @@ class Settings(BaseSettings):
             password=values.get("REDIS_PASSWORD"),
             path=f"/{values.get('REDIS_DB')}",
         )
-    
+
+    # Cache keys
+    CACHE_KEY_PREFIX: str = "cache"
+    CACHE_TAG_TTL: int = 86400
+
+    # In-memory cache
+    CACHE_MEMORY_MAX_ENTRIES: int = 10000
+    CACHE_MEMORY_MAX_BYTES: int = 64 * 1024 * 1024  # 0 disables the byte budget
+    CACHE_MEMORY_SWEEP_INTERVAL: int = 60
+
+    # Near cache (process-local L1 in front of Redis)
+    CACHE_L1_ENABLED: bool = False
+    CACHE_L1_TTL: int = 5
+    CACHE_L1_MAX_ENTRIES: int = 1000
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
+
+    # Batch concurrent cache gets made in the same event-loop tick into one MGET
+    CACHE_AUTO_BATCH: bool = False
+    CACHE_BATCH_MAX_SIZE: int = 100
+
+    # Cache value encoding: json, orjson or msgpack, optionally compressed with zlib, zstd or lz4
+    CACHE_CODEC: str = "json"
+    CACHE_COMPRESSION: Optional[str] = None
+    CACHE_COMPRESSION_MIN_BYTES: int = 1024
+
+    # HTTP response cache
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL: int = 60
+    RESPONSE_CACHE_MAX_AGE: int = 0
+
     # Celery
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
     CELERY_FALLBACK: bool = False
+    # "json" or "compact": CELERY_CODEC (json, orjson or msgpack), compressed
+    # with CELERY_COMPRESSION above CELERY_COMPRESSION_MIN_BYTES
+    CELERY_SERIALIZER: str = "json"
+    CELERY_CODEC: str = "msgpack"
+    CELERY_COMPRESSION: Optional[str] = "zlib"
+    CELERY_COMPRESSION_MIN_BYTES: int = 1024
+    # Default result policy for tasks: ignore, ttl or stored
+    CELERY_RESULT_POLICY: str = "stored"
+    CELERY_RESULT_TTL: int = 3600
+    # Lifetime of task arguments passed by reference through the cache
+    CELERY_PAYLOAD_TTL: int = 3600
+    # Coroutine tasks running at once on each worker's event loop
+    CELERY_ASYNC_CONCURRENCY: int = 100
+    TASK_FALLBACK_WORKERS: int = 4
+    TASK_FALLBACK_QUEUE_SIZE: int = 1000
+    # Fallback priority lanes, highest first; must include "default"
+    TASK_LANES: List[str] = ["high", "default", "low"]
+
+    @validator("TASK_LANES")
+    def require_default_lane(cls, v: List[str]) -> List[str]:
+        if "default" not in v:
+            raise ValueError('TASK_LANES must include "default"')
+        if len(set(v)) != len(v):
+            raise ValueError(f"TASK_LANES has duplicate lanes: {v}")
+        return v
+
+    # Modules imported at startup so their @task functions are registered
+    TASK_MODULES: List[str] = ["app.tasks.example"]
+    TASK_THREAD_WORKERS: int = 8
+    TASK_PROCESS_WORKERS: int = 2
+    # Fallback task results are dropped after this many seconds
+    TASK_RESULT_TTL: int = 3600
+    TASK_RESULT_MAX_ENTRIES: int = 10000
+    # Threads reading Celery results, and the longest wait between reads
+    TASK_RESULT_WORKERS: int = 4
+    TASK_RESULT_POLL_INTERVAL: float = 1.0
+    # Journal tasks to disk while the broker is down and republish them later
+    TASK_SPILL_ENABLED: bool = True
+    TASK_SPILL_PATH: str = "./task_spill.db"
+    TASK_SPILL_COMMIT_INTERVAL: float = 0.005
+    TASK_SPILL_BATCH_SIZE: int = 500
+    TASK_SPILL_DRAIN_INTERVAL: float = 5.0
+    # Drainers claim spilled tasks for this long; unacked claims then expire
+    TASK_SPILL_CLAIM_TIMEOUT: float = 60.0
     
     # OpenTelemetry
     OTEL_EXPORTER_OTLP_ENDPOINT: Optional[str] = None
@@ -109,6 +218,46 @@ class Settings(BaseSettings):
     TRACING_SERVICE_NAME: str = "fastapi-template"
     EXTERNAL_SERVICE_TIMEOUT: int = 30
     EXTERNAL_SERVICE_RETRIES: int = 3
+
+    # Outbound HTTP clients (EXTERNAL_SERVICE_TIMEOUT is the request timeout)
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 5.0
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CLIENT_HTTP2: bool = False  # requires h2
+
+    # Retries: full-jitter exponential backoff, with retries capped per
+    # dependency at RETRY_BUDGET_RATIO of calls plus a small per-second reserve
+    RETRY_MAX_ATTEMPTS: int = 3
+    RETRY_BASE_DELAY: float = 0.1
+    RETRY_MAX_DELAY: float = 2.0
+    RETRY_BUDGET_RATIO: float = 0.1
+    RETRY_BUDGET_MIN_PER_SECOND: float = 1.0
+    # Time budget for retries made while handling a request; 0 disables it
+    REQUEST_DEADLINE: float = 30.0
+
+    # Bulkheads: per-dependency concurrency limit, static or adapted to latency
+    # (aimd or gradient) between the min and max, with a bounded wait queue
+    BULKHEAD_ENABLED: bool = True
+    BULKHEAD_STRATEGY: str = "static"
+    BULKHEAD_LIMIT: int = 50
+    BULKHEAD_MIN_LIMIT: int = 1
+    BULKHEAD_MAX_LIMIT: int = 200
+    BULKHEAD_MAX_QUEUE: int = 100
+    BULKHEAD_QUEUE_TIMEOUT: float = 1.0
+
+    # Circuit breakers: open when the failure or slow-call rate over the
+    # window reaches its threshold, after at least the minimum number of calls
+    CIRCUIT_BREAKER_FAILURE_RATE: float = 0.5
+    CIRCUIT_BREAKER_SLOW_CALL_RATE: float = 1.0
+    CIRCUIT_BREAKER_SLOW_CALL_DURATION: float = 5.0
+    CIRCUIT_BREAKER_WINDOW: int = 60
+    CIRCUIT_BREAKER_MINIMUM_CALLS: int = 10
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = 30.0
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS: int = 3
+    # Share breaker state across processes through Redis, synced at most this often
+    CIRCUIT_BREAKER_SHARED: bool = False
+    CIRCUIT_BREAKER_SYNC_INTERVAL: float = 1.0
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -1,95 +1,664 @@
-from celery import Celery
+from celery import chord, group
 from app.core.settings import settings
 import logging
 import asyncio
-from typing import Any, Callable, Dict, Optional
-from functools import wraps
+import importlib
+import inspect
+import itertools
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from functools import partial, wraps
+
+from app.core.celery import celery_app
+from app.core.journal import SpillJournal
+from app.core.memory_cache import MemoryCache
+from app.core.payloads import resolve_payloads
+from app.core.metrics import (
+    TASK_DURATION_SECONDS,
+    TASK_QUEUE_DEPTH,
+    TASK_RESULTS,
+    TASK_SPILL_REPUBLISHED,
+    TASK_SPILLED,
+    TASK_WAIT_SECONDS,
+)
 
 logger = logging.getLogger(__name__)
 
+# Finished fallback task results, kept for TASK_RESULT_TTL seconds
+fallback_results = MemoryCache(
+    max_entries=settings.TASK_RESULT_MAX_ENTRIES,
+    sweep_interval=settings.CACHE_MEMORY_SWEEP_INTERVAL,
+)
+
+EXECUTORS = ("async", "thread", "process")
+
+
+class TaskLimiter:
+    """Token-bucket rate limit and concurrency cap for one task name."""
+
+    def __init__(
+        self,
+        rate_limit: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.rate_limit = rate_limit
+        self.capacity = float(burst or max(1, int(rate_limit or 1)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.max_concurrency = max_concurrency
+        self.running = 0
+        # Tasks parked until a running one finishes
+        self.waiting: Deque[tuple] = deque()
+
+    def try_acquire(self) -> Optional[float]:
+        """Take a slot, returning None on success or the seconds to wait otherwise.
+
+        ``inf`` means the task must wait for a running one to finish.
+        """
+        if self.max_concurrency is not None and self.running >= self.max_concurrency:
+            return float("inf")
+        if self.rate_limit:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_limit)
+            self.updated = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate_limit
+            self.tokens -= 1
+        self.running += 1
+        return None
+
+    def release(self) -> None:
+        self.running -= 1
+
+
+class TaskSpec:
+    """A registered task, the executor class it runs on and its dispatch limits."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        executor: str = "async",
+        lane: str = "default",
+        rate_limit: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor {executor} for task {name}")
+        if lane not in settings.TASK_LANES:
+            raise ValueError(f"Unknown lane {lane} for task {name}")
+        self.name = name
+        self.func = func
+        self.executor = executor
+        self.lane = lane
+        self.limiter: Optional[TaskLimiter] = None
+        if rate_limit or max_concurrency:
+            self.limiter = TaskLimiter(rate_limit, burst, max_concurrency)
+
+
+registry: Dict[str, TaskSpec] = {}
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def register_task(name: str, func: Callable, executor: str = "async", **limits: Any) -> TaskSpec:
+    """Add a task to the registry."""
+    if name in registry and registry[name].func is not func:
+        logger.warning(f"Task {name} registered twice, replacing it")
+    spec = registry[name] = TaskSpec(name, func, executor, **limits)
+    return spec
+
+
+def load_task_modules() -> None:
+    """Import the configured task modules so their tasks register themselves."""
+    for module in settings.TASK_MODULES:
+        importlib.import_module(module)
+
+
+def _run_registered(task_name: str, args: tuple, kwargs: dict) -> Any:
+    """Entry point in pool processes, which look tasks up by name."""
+    if task_name not in registry:
+        load_task_modules()
+    return registry[task_name].func(*args, **kwargs)
+
+
+async def run_task(spec: TaskSpec, args: tuple, kwargs: dict) -> Any:
+    """Run a task on its executor: the event loop, a thread or a process."""
+    global _thread_pool, _process_pool
+    loop = asyncio.get_running_loop()
+    args, kwargs = await resolve_payloads(args, kwargs)
+
+    if spec.executor == "thread":
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(
+                max_workers=settings.TASK_THREAD_WORKERS,
+                thread_name_prefix="task",
+            )
+        return await loop.run_in_executor(_thread_pool, partial(spec.func, *args, **kwargs))
+
+    if spec.executor == "process":
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=settings.TASK_PROCESS_WORKERS)
+        return await loop.run_in_executor(
+            _process_pool, partial(_run_registered, spec.name, args, kwargs)
+        )
+
+    result = spec.func(*args, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def shutdown_executors() -> None:
+    """Stop the task thread and process pools."""
+    global _thread_pool, _process_pool
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+# (lane priority, sequence, task id, task name, args, kwargs, queued at)
+QueueItem = Tuple[int, int, str, str, tuple, dict, float]
+
+
+class FallbackDispatcher:
+    """Runs fallback tasks from a bounded queue on a pool of concurrent workers.
+
+    Tasks are served from priority lanes in ``TASK_LANES`` order, FIFO within a
+    lane. Tasks over their rate limit or concurrency cap are parked and requeued
+    once they may run, so they never hold up a worker.
+    """
+
+    def __init__(self, workers: int = 4, max_size: int = 1000, lanes: Optional[List[str]] = None):
+        self.workers = workers
+        self.lanes = list(lanes or settings.TASK_LANES)
+        # Bounded so producers wait instead of growing an unbounded backlog
+        self.queue: "asyncio.PriorityQueue[QueueItem]" = asyncio.PriorityQueue(max_size)
+        self._sequence = itertools.count()
+        # Futures for queued or running tasks, resolved when they finish
+        self.pending: Dict[str, asyncio.Future] = {}
+        self._requeues: Set[asyncio.Task] = set()
+
+    def reserve(self) -> str:
+        """Create a task id whose result can be awaited before it is queued."""
+        task_id = f"fallback_{uuid.uuid4().hex}"
+        self.pending[task_id] = asyncio.get_running_loop().create_future()
+        return task_id
+
+    def _lane(self, task_name: str) -> str:
+        spec = registry.get(task_name)
+        return spec.lane if spec is not None and spec.lane in self.lanes else "default"
+
+    async def _put(self, item: QueueItem) -> None:
+        await self.queue.put(item)
+        TASK_QUEUE_DEPTH.labels(self.lanes[item[0]]).inc()
+
+    async def submit(
+        self,
+        task_name: str,
+        args: tuple,
+        kwargs: dict,
+        task_id: Optional[str] = None,
+    ) -> str:
+        """Queue a task, waiting for room if the queue is full."""
+        if task_id is None:
+            task_id = self.reserve()
+        priority = self.lanes.index(self._lane(task_name))
+        item = (priority, next(self._sequence), task_id, task_name, args, kwargs, time.monotonic())
+        try:
+            await self._put(item)
+        except BaseException:
+            self.pending.pop(task_id, None)
+            raise
+        return task_id
+
+    async def _requeue(self, item: QueueItem, delay: float = 0) -> None:
+        # The parked item only counts as done once it is back in the queue,
+        # so queue.join() keeps waiting for it
+        try:
+            await asyncio.sleep(delay)
+            await self._put(item)
+        finally:
+            self.queue.task_done()
+
+    def _schedule_requeue(self, item: QueueItem, delay: float = 0) -> None:
+        requeue = asyncio.create_task(self._requeue(item, delay))
+        self._requeues.add(requeue)
+        requeue.add_done_callback(self._requeues.discard)
+
+    def _park(self, item: QueueItem, limiter: TaskLimiter, wait: float) -> None:
+        if wait == float("inf"):
+            limiter.waiting.append(item)
+        else:
+            self._schedule_requeue(item, wait)
+
+    def resolve(self, task_id: str, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Settle the future for a task so its waiters wake."""
+        future = self.pending.pop(task_id, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+            # Don't warn about failures nobody waited for
+            future.exception()
+        else:
+            future.set_result(result)
+
+    async def _execute(self, task_id: str, task_name: str, args: tuple, kwargs: dict) -> None:
+        spec = registry.get(task_name)
+        if spec is None:
+            logger.error(f"Unknown fallback task {task_name}")
+            TASK_RESULTS.labels(task_name, "unknown").inc()
+            self.resolve(task_id, error=LookupError(f"Unknown task {task_name}"))
+            return
+
+        start = time.monotonic()
+        try:
+            result = await run_task(spec, args, kwargs)
+            fallback_results.set(task_id, result, expire=settings.TASK_RESULT_TTL)
+            TASK_RESULTS.labels(task_name, "success").inc()
+            self.resolve(task_id, result)
+        except Exception as e:
+            logger.error(f"Error processing fallback task {task_name}: {e}")
+            TASK_RESULTS.labels(task_name, "failure").inc()
+            self.resolve(task_id, error=e)
+        finally:
+            TASK_DURATION_SECONDS.labels(task_name).observe(time.monotonic() - start)
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self.queue.get()
+            priority, _, task_id, task_name, args, kwargs, queued_at = item
+            lane = self.lanes[priority]
+            TASK_QUEUE_DEPTH.labels(lane).dec()
+
+            spec = registry.get(task_name)
+            limiter = spec.limiter if spec is not None else None
+            if limiter is not None:
+                wait = limiter.try_acquire()
+                if wait is not None:
+                    self._park(item, limiter, wait)
+                    continue
+
+            TASK_WAIT_SECONDS.labels(lane, task_name).observe(time.monotonic() - queued_at)
+            try:
+                await self._execute(task_id, task_name, args, kwargs)
+            finally:
+                if limiter is not None:
+                    limiter.release()
+                    if limiter.waiting:
+                        self._schedule_requeue(limiter.waiting.popleft())
+                self.queue.task_done()
+
+    async def run(self) -> None:
+        """Run the workers until cancelled."""
+        workers: List[asyncio.Task] = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        fallback_results.start()
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await fallback_results.stop()
+
+
 # In-memory fallback queue
-fallback_queue = []
-fallback_results = {}
+dispatcher = FallbackDispatcher(
+    workers=settings.TASK_FALLBACK_WORKERS,
+    max_size=settings.TASK_FALLBACK_QUEUE_SIZE,
+)
+
+# (task name, args, kwargs) for one task message
+TaskCall = Tuple[str, tuple, dict]
+
 
 class TaskQueue:
     def __init__(self):
         self.celery_app = None
         self.use_fallback = settings.CELERY_FALLBACK
-        
+        self._background: Set[asyncio.Task] = set()
+        # Tasks that can't be published are journaled and republished later
+        self.journal: Optional[SpillJournal] = None
+        self._spilling = False
+        # Set while this process runs drain_spill_journal
+        self.draining = False
+        # Result backend reads, kept off the default executor that publishes use
+        self._result_pool: Optional[ThreadPoolExecutor] = None
+        if settings.TASK_SPILL_ENABLED:
+            self.journal = SpillJournal(
+                settings.TASK_SPILL_PATH,
+                commit_interval=settings.TASK_SPILL_COMMIT_INTERVAL,
+                max_batch=settings.TASK_SPILL_BATCH_SIZE,
+            )
+
         if not self.use_fallback:
-            try:
-                self.celery_app = Celery(
-                    "fastapi_template",
-                    broker=settings.CELERY_BROKER_URL,
-                    backend=settings.CELERY_RESULT_BACKEND,
+            # Share the worker app's configuration, serializers included; the
+            # broker isn't contacted until connect() or the first publish
+            self.celery_app = celery_app
+
+    async def connect(self) -> None:
+        """Check the broker is reachable so the first publish finds a warm connection."""
+        if self.celery_app is None:
+            return
+        if await asyncio.to_thread(self._broker_available):
+            logger.info("Successfully connected to Celery")
+        else:
+            logger.warning("Celery broker is unreachable, tasks will be spilled or run in-process")
+
+    async def close(self) -> None:
+        """Flush pending spill journal writes and stop the result readers."""
+        if self.journal is not None:
+            await self.journal.close()
+        if self._result_pool is not None:
+            self._result_pool.shutdown(wait=False, cancel_futures=True)
+            self._result_pool = None
+
+    def _publish(
+        self,
+        calls: List[TaskCall],
+        callback: Optional[TaskCall] = None,
+        task_ids: Optional[List[Optional[str]]] = None,
+    ) -> List[str]:
+        """Publish task messages using producers from Celery's connection pool."""
+        task_ids = task_ids or [None] * len(calls)
+        with self.celery_app.producer_or_acquire() as producer:
+            if len(calls) == 1 and callback is None:
+                name, args, kwargs = calls[0]
+                task = self.celery_app.send_task(
+                    name, args=args, kwargs=kwargs, task_id=task_ids[0], producer=producer
                 )
-                logger.info("Successfully connected to Celery")
-            except Exception as e:
-                logger.warning(f"Failed to connect to Celery: {e}")
-                self.use_fallback = True
-    
+                return [task.id]
+
+            header = group(
+                [
+                    self.celery_app.signature(
+                        name, args=args, kwargs=kwargs, **({"task_id": task_id} if task_id else {})
+                    )
+                    for (name, args, kwargs), task_id in zip(calls, task_ids)
+                ],
+                app=self.celery_app,
+            )
+            if callback is None:
+                return [result.id for result in header.apply_async(producer=producer).results]
+
+            name, args, kwargs = callback
+            # Without app= the chord would publish and track results through
+            # whichever Celery app is current
+            body = self.celery_app.signature(name, args=args, kwargs=kwargs)
+            result = chord(header, body, app=self.celery_app).apply_async(producer=producer)
+            return [child.id for child in result.parent.results] + [result.id]
+
+    def _broker_available(self) -> bool:
+        """Check that a broker connection can be opened."""
+        connection = self.celery_app.connection_for_write()
+        try:
+            connection.ensure_connection(max_retries=1)
+            return True
+        except Exception:
+            return False
+        finally:
+            connection.release()
+
+    async def _spill(self, calls: List[TaskCall]) -> Optional[List[str]]:
+        """Journal tasks for later republishing, or return None if that fails."""
+        if self.journal is None:
+            return None
+        task_ids = [str(uuid.uuid4()) for _ in calls]
+        try:
+            # Appends made together share one journal commit
+            await asyncio.gather(*(
+                self.journal.append(task_id, name, args, kwargs)
+                for task_id, (name, args, kwargs) in zip(task_ids, calls)
+            ))
+        except Exception as e:
+            logger.error(f"Task spill journal error: {e}")
+            return None
+        # Keep journaling until the drainer catches up so tasks stay in order;
+        # without a drainer here nothing would reset it, so keep trying the broker
+        self._spilling = self.draining
+        for name, _, _ in calls:
+            TASK_SPILLED.labels(name).inc()
+        return task_ids
+
     async def delay(self, task_name: str, *args, **kwargs) -> str:
         """Delay a task for execution."""
         if self.use_fallback:
-            task_id = f"fallback_{len(fallback_queue)}"
-            fallback_queue.append((task_id, task_name, args, kwargs))
-            return task_id
-        
+            return await dispatcher.submit(task_name, args, kwargs)
+
+        calls = [(task_name, args, kwargs)]
+        if not self._spilling:
+            try:
+                # Broker publishes block, so run them in a thread
+                task_ids = await asyncio.to_thread(self._publish, calls)
+                return task_ids[0]
+            except Exception as e:
+                logger.error(f"Celery delay error: {e}")
+
+        task_ids = await self._spill(calls)
+        if task_ids:
+            return task_ids[0]
+        return await dispatcher.submit(task_name, args, kwargs)
+
+    async def delay_many(
+        self,
+        calls: Iterable[TaskCall],
+        callback: Optional[TaskCall] = None,
+    ) -> List[str]:
+        """Delay many tasks in one broker round trip.
+
+        ``calls`` are ``(task_name, args, kwargs)`` tuples published as a group.
+        With a ``callback`` they form a chord: the callback runs once every task
+        has finished, with the list of their results as its first argument.
+        Returns the task ids in order, followed by the callback's id if given.
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+
+        if not self.use_fallback:
+            if not self._spilling:
+                try:
+                    return await asyncio.to_thread(self._publish, calls, callback)
+                except Exception as e:
+                    logger.error(f"Celery delay_many error: {e}")
+            # Chords need their results in one place, so only plain batches spill
+            if callback is None:
+                task_ids = await self._spill(calls)
+                if task_ids:
+                    return task_ids
+
+        task_ids = [await dispatcher.submit(name, args, kwargs) for name, args, kwargs in calls]
+        if callback is None:
+            return task_ids
+
+        callback_id = dispatcher.reserve()
+        chord_task = asyncio.create_task(self._run_fallback_chord(task_ids, callback, callback_id))
+        self._background.add(chord_task)
+        chord_task.add_done_callback(self._background.discard)
+        return task_ids + [callback_id]
+
+    async def _run_fallback_chord(self, task_ids: List[str], callback: TaskCall, callback_id: str) -> None:
+        name, args, kwargs = callback
         try:
-            task = self.celery_app.send_task(task_name, args=args, kwargs=kwargs)
-            return task.id
+            results = [await self.wait_result(task_id) for task_id in task_ids]
         except Exception as e:
-            logger.error(f"Celery delay error: {e}")
-            task_id = f"fallback_{len(fallback_queue)}"
-            fallback_queue.append((task_id, task_name, args, kwargs))
-            return task_id
-    
+            logger.error(f"Fallback chord for {name} failed: {e}")
+            dispatcher.resolve(callback_id, error=e)
+            return
+        await dispatcher.submit(name, (results, *args), kwargs, task_id=callback_id)
+
+    async def drain_spilled(self) -> int:
+        """Republish journaled tasks in batches once the broker is reachable."""
+        if self.journal is None or self.celery_app is None:
+            return 0
+        if not await self.journal.count():
+            self._spilling = False
+            return 0
+        if not await asyncio.to_thread(self._broker_available):
+            return 0
+
+        drained = 0
+        while True:
+            # Claimed rows are skipped by drainers in other processes
+            batch = await self.journal.claim(settings.TASK_SPILL_BATCH_SIZE, settings.TASK_SPILL_CLAIM_TIMEOUT)
+            if not batch:
+                self._spilling = False
+                break
+            row_ids = [row_id for row_id, _, _, _, _ in batch]
+            calls = [(name, tuple(args), kwargs) for _, _, name, args, kwargs in batch]
+            task_ids = [task_id for _, task_id, _, _, _ in batch]
+            try:
+                # Republish under the original ids so callers can still wait on them
+                await asyncio.to_thread(self._publish, calls, None, task_ids)
+            except Exception:
+                await self.journal.release(row_ids)
+                raise
+            await self.journal.ack(row_ids)
+            for name, _, _ in calls:
+                TASK_SPILL_REPUBLISHED.labels(name).inc()
+            drained += len(batch)
+
+        logger.info(f"Republished {drained} spilled tasks to Celery")
+        return drained
+
     async def get_result(self, task_id: str) -> Optional[Any]:
-        """Get task result."""
+        """Get task result, or None if it is not ready."""
         if task_id.startswith("fallback_"):
             return fallback_results.get(task_id)
-        
+
         try:
-            result = self.celery_app.AsyncResult(task_id)
-            return result.get() if result.ready() else None
+            ready, value = await self._poll_result(task_id)
+            return value if ready else None
         except Exception as e:
             logger.error(f"Celery get_result error: {e}")
             return fallback_results.get(task_id)
 
+    def _read_result(self, task_id: str) -> Tuple[bool, Any]:
+        # AsyncResult is built here since Celery backends keep per-thread state
+        result = self.celery_app.AsyncResult(task_id)
+        if not result.ready():
+            return False, None
+        # Re-raises the task's exception if it failed
+        return True, result.get()
+
+    async def _poll_result(self, task_id: str) -> Tuple[bool, Any]:
+        """Read a task's state from the result backend once, off the event loop."""
+        if self._result_pool is None:
+            self._result_pool = ThreadPoolExecutor(
+                max_workers=settings.TASK_RESULT_WORKERS,
+                thread_name_prefix="task-result",
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._result_pool, self._read_result, task_id)
+
+    async def wait_result(self, task_id: str, timeout: Optional[float] = None) -> Any:
+        """Wait for a task to finish and return its result.
+
+        Raises ``asyncio.TimeoutError`` if it does not finish within ``timeout``
+        seconds, and re-raises the task's exception if it failed. Celery
+        results are polled with backoff, so a waiter only holds a thread for
+        the duration of each backend read.
+        """
+        if task_id.startswith("fallback_"):
+            future = dispatcher.pending.get(task_id)
+            if future is None:
+                if task_id in fallback_results:
+                    return fallback_results.get(task_id)
+                raise KeyError(f"Unknown or expired task {task_id}")
+            # Shield so a timed out waiter doesn't cancel the shared future
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        delay = 0.05
+        while True:
+            ready, value = await self._poll_result(task_id)
+            if ready:
+                return value
+            wait = delay
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"Task {task_id} did not finish in {timeout}s")
+                wait = min(wait, remaining)
+            await asyncio.sleep(wait)
+            delay = min(delay * 2, settings.TASK_RESULT_POLL_INTERVAL)
+
 # Global task queue instance
 task_queue = TaskQueue()
 
-def task(name: Optional[str] = None):
-    """Decorator for creating tasks."""
+def task(
+    name: Optional[str] = None,
+    executor: str = "async",
+    lane: str = "default",
+    rate_limit: Optional[float] = None,
+    burst: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+):
+    """Decorator for creating tasks.
+
+    ``executor`` picks where the task runs in fallback mode: ``async`` on the
+    event loop, ``thread`` in a thread pool for blocking I/O, or ``process``
+    in a process pool for CPU-bound work. ``lane`` is one of ``TASK_LANES``;
+    ``rate_limit`` (tasks per second, with ``burst``) and ``max_concurrency``
+    throttle the task in the fallback dispatcher.
+
+    Applied over ``@celery_app.task`` it returns the Celery task unchanged,
+    so ``.delay`` and ``.apply_async`` keep working, and only registers what
+    the fallback dispatcher runs. Plain coroutine functions are wrapped to run
+    in-process in fallback mode and be queued otherwise.
+    """
     def decorator(func: Callable):
         task_name = name or func.__name__
-        
+        # Celery tasks wrapped with run_async are awaited directly in fallback mode
+        target = getattr(getattr(func, "run", func), "__async_task__", func)
+        spec = register_task(
+            task_name,
+            target,
+            executor,
+            lane=lane,
+            rate_limit=rate_limit,
+            burst=burst,
+            max_concurrency=max_concurrency,
+        )
+        if hasattr(func, "apply_async"):
+            return func
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
             if task_queue.use_fallback:
                 # Execute task immediately in fallback mode
-                result = await func(*args, **kwargs)
-                task_id = f"fallback_{len(fallback_queue)}"
-                fallback_results[task_id] = result
-                return result
-            
+                return await run_task(spec, args, kwargs)
+
             return await task_queue.delay(task_name, *args, **kwargs)
-        
+
         return wrapper
     return decorator
 
 async def process_fallback_queue():
     """Process tasks in the fallback queue."""
-    while True:
-        if fallback_queue:
-            task_id, task_name, args, kwargs = fallback_queue.pop(0)
+    await dispatcher.run()
+
+async def drain_spill_journal():
+    """Periodically hand spilled tasks back to Celery."""
+    task_queue.draining = True
+    try:
+        while True:
+            await asyncio.sleep(settings.TASK_SPILL_DRAIN_INTERVAL)
             try:
-                # Find and execute the task function
-                task_func = globals().get(task_name)
-                if task_func:
-                    result = await task_func(*args, **kwargs)
-                    fallback_results[task_id] = result
+                await task_queue.drain_spilled()
             except Exception as e:
-                logger.error(f"Error processing fallback task {task_name}: {e}")
-        
-        await asyncio.sleep(1)  # Prevent CPU spinning 
\ No newline at end of file
+                logger.error(f"Error draining spilled tasks: {e}")
+    finally:
+        task_queue.draining = False
\ No newline at end of file
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+from app.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_PINGS
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+
+def engine_options(url: str, name: str) -> Dict[str, Any]:
+    """Keyword arguments for create_async_engine built from the DB_POOL_* settings."""
+    if settings.DB_POOL_PRE_PING not in PRE_PING_STRATEGIES:
+        raise ValueError(
+            f"Unknown DB_POOL_PRE_PING {settings.DB_POOL_PRE_PING!r}, expected one of {PRE_PING_STRATEGIES}"
+        )
+    options: Dict[str, Any] = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING == "always",
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    # SQLite uses a pool without size limits
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_logging_name=name,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def pool_label(engine: AsyncEngine) -> str:
+    """Name labelling an engine's pool metrics; it survives the pool being recreated on dispose."""
+    return engine.sync_engine.pool.logging_name or "default"
+
+
+def install_pool_metrics(engine: AsyncEngine, name: str) -> None:
+    """Export how many connections a sized pool has checked out and beyond its size.
+
+    Install after any checkout listener that may reject a connection, since
+    the pool then retries the checkout without checking the connection in.
+    """
+    sync_engine = engine.sync_engine
+    if not isinstance(sync_engine.pool, QueuePool):
+        return
+    checked_out = 0
+    opened = 0
+
+    def report() -> None:
+        DB_POOL_CHECKED_OUT.labels(name).set(checked_out)
+        DB_POOL_OVERFLOW.labels(name).set(opened - sync_engine.pool.size())
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        nonlocal opened
+        opened += 1
+        report()
+
+    @event.listens_for(sync_engine, "close")
+    def on_close(dbapi_connection: Any, connection_record: Any) -> None:
+        nonlocal opened
+        opened -= 1
+        report()
+
+    @event.listens_for(sync_engine, "detach")
+    def on_detach(dbapi_connection: Any, connection_record: Any) -> None:
+        # Detached connections are closed outside the pool
+        nonlocal opened
+        opened -= 1
+        report()
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+        nonlocal checked_out
+        checked_out += 1
+        report()
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection: Any, connection_record: Any) -> None:
+        nonlocal checked_out
+        checked_out -= 1
+        report()
+
+
+def install_idle_pre_ping(engine: AsyncEngine, name: str) -> None:
+    """With the idle pre-ping strategy, ping connections left unused too long before handing them out."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if (
+            settings.DB_POOL_PRE_PING == "idle"
+            and checked_in_at is not None
+            and time.monotonic() - checked_in_at >= settings.DB_POOL_PRE_PING_IDLE
+        ):
+            try:
+                sync_engine.dialect.do_ping(dbapi_connection)
+            except Exception as e:
+                DB_POOL_PINGS.labels(name, "disconnected").inc()
+                logger.info(f"Discarding stale {name} database connection: {e}")
+                # The pool replaces the connection and retries the checkout
+                raise DisconnectionError() from e
+            DB_POOL_PINGS.labels(name, "ok").inc()
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection: Any, connection_record: Any) -> None:
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+
+async def warm_pool(engine: AsyncEngine, count: int) -> None:
+    """Open up to ``count`` connections at once and return them to the pool idle."""
+    # Only sized pools keep idle connections around
+    count = min(count, settings.DB_POOL_SIZE)
+    if count <= 0 or not isinstance(engine.sync_engine.pool, QueuePool):
+        return
+    results = await asyncio.gather(*(engine.connect().start() for _ in range(count)), return_exceptions=True)
+    opened = [conn for conn in results if not isinstance(conn, BaseException)]
+    await asyncio.gather(*(conn.close() for conn in opened))
+    if len(opened) < count:
+        logger.warning(f"Opened {len(opened)} of {count} database connections while warming the pool")
+    else:
+        logger.info(f"Warmed database pool with {count} connections")
@@ -1,61 +1,154 @@
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import SQLAlchemyError
-from tenacity import retry, stop_after_attempt, wait_exponential
 import asyncio
+import time
+from typing import AsyncGenerator, Optional
+import asyncpg
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import (
+    DisconnectionError,
+    InterfaceError,
+    OperationalError,
+    SQLAlchemyError,
+    TimeoutError as PoolTimeoutError,
+)
+from sqlalchemy.sql import text
 
+from app.core.metrics import DB_POOL_CHECKOUT_SECONDS, DB_REQUESTS_SHED
+from app.core.retry import get_retry_policy
 from app.core.settings import settings
+from app.db.pool import (
+    engine_options,
+    install_idle_pre_ping,
+    install_pool_metrics,
+    pool_label,
+    warm_pool,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
-@retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=4, max=10))
-async def create_engine():
-    """Create database engine with retry logic."""
+# Errors worth retrying while the database starts up or restarts; anything
+# else (bad URL, missing driver, programming errors) fails straight away
+CONNECTION_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    OperationalError,
+    InterfaceError,
+    DisconnectionError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+)
+
+# Created on first use or by connect_db() at startup, never at import
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[sessionmaker] = None
+
+
+def create_engine(url: str, name: str = "api") -> AsyncEngine:
+    """Create an engine with the configured pool; ``name`` labels its pool metrics."""
+    engine = create_async_engine(url, **engine_options(url, name))
+    # The pre-ping listener may reject a checkout, so it goes first
+    install_idle_pre_ping(engine, name)
+    install_pool_metrics(engine, name)
+    return engine
+
+
+def _use_engine(engine: AsyncEngine) -> None:
+    global _engine, _session_factory
+    _engine = engine
+    _session_factory = sessionmaker(
+        engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+
+def get_engine() -> AsyncEngine:
+    """Return the database engine, creating it without connecting if needed."""
+    if _engine is None:
+        _use_engine(create_engine(str(settings.SQLALCHEMY_DATABASE_URI)))
+    return _engine
+
+
+def async_session_factory() -> AsyncSession:
+    """Create a session bound to the database engine."""
+    get_engine()
+    return _session_factory()
+
+
+async def _ping(engine: AsyncEngine) -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def connect_db() -> AsyncEngine:
+    """Create the engine and wait for the database to accept connections.
+
+    Connection errors are retried until DB_STARTUP_TIMEOUT, so the app rides
+    out a database that is still starting. With DB_FALLBACK set it makes a
+    single attempt and falls back to SQLite instead of waiting.
+    """
+    engine = get_engine()
+    policy = get_retry_policy(
+        "db.startup",
+        max_attempts=1 if settings.DB_FALLBACK else None,
+        base_delay=0.5,
+        max_delay=5.0,
+        retry_on=CONNECTION_ERRORS,
+        budget=None,
+    )
     try:
-        engine = create_async_engine(
-            str(settings.SQLALCHEMY_DATABASE_URI),
-            pool_pre_ping=True,
-            pool_size=5,
-            max_overflow=10,
-            echo=settings.DEBUG,
-        )
+        await policy.run(_ping, engine, timeout=settings.DB_STARTUP_TIMEOUT)
         logger.info("Successfully connected to primary database")
-        return engine
-    except Exception as e:
+        await warm_pool(engine, settings.DB_POOL_WARM)
+    except CONNECTION_ERRORS as e:
         logger.warning(f"Failed to connect to primary database: {e}")
-        if settings.DB_FALLBACK:
-            logger.info("Falling back to SQLite database")
-            engine = create_async_engine(
-                str(settings.SQLITE_DB_PATH),
-                pool_pre_ping=True,
-                pool_size=5,
-                max_overflow=10,
-                echo=settings.DEBUG,
-            )
-            return engine
-        raise
-
-# Create async engine
-engine = asyncio.run(create_engine())
-
-# Create async session factory
-async_session_factory = sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+        if not settings.DB_FALLBACK:
+            raise
+        logger.info("Falling back to SQLite database")
+        await engine.dispose()
+        _use_engine(create_engine(str(settings.SQLITE_DB_PATH)))
+    return _engine
+
+
+async def close_db() -> None:
+    """Close all pooled database connections."""
+    global _engine, _session_factory
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        _session_factory = None
+
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency for getting async database sessions.
     Handles fallback to SQLite if primary database is unavailable.
     """
     async with async_session_factory() as session:
+        # Check out a connection up front so transient failures are retried
+        # here, within the request's deadline, rather than mid-handler. Waiting
+        # on an exhausted pool is never retried, and the whole acquisition is
+        # capped at DB_ACQUIRE_TIMEOUT so saturation sheds requests quickly
+        # instead of piling them up behind the pool timeout.
+        policy = get_retry_policy("db", no_retry_on=(PoolTimeoutError,))
+        start = time.perf_counter()
+        try:
+            await policy.run(session.connection, timeout=settings.DB_ACQUIRE_TIMEOUT)
+        except (PoolTimeoutError, asyncio.TimeoutError) as e:
+            reason = "pool_timeout" if isinstance(e, PoolTimeoutError) else "acquire_timeout"
+            DB_REQUESTS_SHED.labels(reason).inc()
+            logger.warning(f"Shedding request, no database connection available: {reason}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database is busy, please retry shortly",
+                headers={"Retry-After": str(settings.DB_SHED_RETRY_AFTER)},
+            )
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(pool_label(session.bind)).observe(time.perf_counter() - start)
         try:
             yield session
         except SQLAlchemyError as e:
@@ -65,4 +158,4 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
                 async with async_session_factory() as fallback_session:
                     yield fallback_session
             else:
-                raise 
\ No newline at end of file
+                raise
@@ -3,6 +3,7 @@ from typing import List, Optional
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import cache
 from app.core.security import get_password_hash
 from app.domains.users.models import User
 from app.domains.users.schemas import UserCreate, UserUpdate
@@ -37,7 +38,9 @@ class UserService:
             is_active=user_in.is_active,
             is_superuser=user_in.is_superuser,
         )
-        return await self.repository.create(user)
+        user = await self.repository.create(user)
+        await cache.invalidate_tags("users")
+        return user
 
     async def update(self, user_id: int, user_in: UserUpdate) -> User:
         """Update a user."""
@@ -52,8 +55,11 @@ class UserService:
         for field, value in update_data.items():
             setattr(user, field, value)
 
-        return await self.repository.update(user)
+        user = await self.repository.update(user)
+        await cache.invalidate_tags(f"user:{user_id}", "users")
+        return user
 
     async def delete(self, user_id: int) -> None:
         """Delete a user."""
-        await self.repository.delete(user_id) 
\ No newline at end of file
+        await self.repository.delete(user_id)
+        await cache.invalidate_tags(f"user:{user_id}", "users") 
\ No newline at end of file
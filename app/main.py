@@ -1,21 +1,31 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_client import make_asgi_app
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-import asyncio
 import logging
 
 from app.core.settings import settings
 from app.api.router import api_router
 from app.core.logging import configure_logging
-from app.core.middleware import RequestLoggingMiddleware
-from app.core.tracing import configure_tracing
-from app.core.tasks import process_fallback_queue
+from app.core.middleware import RequestDeadlineMiddleware, RequestLoggingMiddleware
+from app.core.resources import resources
 from app.core.cache import cache
-from app.db.session import engine, async_session_factory
+from app.middleware import CacheRule, ResponseCacheMiddleware
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown."""
+    await resources.start()
+    try:
+        yield
+    finally:
+        await resources.close()
+
+
 def create_application() -> FastAPI:
     # Configure logging
     configure_logging()
@@ -26,8 +36,28 @@ def create_application() -> FastAPI:
         openapi_url=f"{settings.API_V1_STR}/openapi.json",
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=lifespan,
     )
     
+    # Cache GET responses for read-heavy routes
+    if settings.RESPONSE_CACHE_ENABLED:
+        app.add_middleware(
+            ResponseCacheMiddleware,
+            rules=[
+                CacheRule(
+                    f"{settings.API_V1_STR}/users/",
+                    tags=["users"],
+                    expire=settings.RESPONSE_CACHE_TTL,
+                ),
+                CacheRule(
+                    f"{settings.API_V1_STR}/users/{{user_id}}",
+                    tags=["user:{user_id}"],
+                    expire=settings.RESPONSE_CACHE_TTL,
+                ),
+            ],
+            max_age=settings.RESPONSE_CACHE_MAX_AGE,
+        )
+
     # Set up CORS
     app.add_middleware(
         CORSMiddleware,
@@ -37,11 +67,19 @@ def create_application() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Bound the retries made for each request
+    if settings.REQUEST_DEADLINE > 0:
+        app.add_middleware(RequestDeadlineMiddleware, seconds=settings.REQUEST_DEADLINE)
+
     # Add request logging middleware
     app.add_middleware(RequestLoggingMiddleware)
     
     # Configure OpenTelemetry
     if settings.OTEL_EXPORTER_OTLP_ENDPOINT:
+        # Imported here since the instrumentation is slow to import
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+        from app.core.tracing import configure_tracing
+
         configure_tracing()
         FastAPIInstrumentor.instrument_app(app)
     
@@ -58,33 +96,13 @@ def create_application() -> FastAPI:
 app = create_application()
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize application on startup."""
-    # Start fallback queue processor if needed
-    if settings.CELERY_FALLBACK:
-        asyncio.create_task(process_fallback_queue())
-        logger.info("Started fallback queue processor")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown."""
-    # Close database connections
-    await engine.dispose()
-    
-    # Close Redis connection if not in fallback mode
-    if not settings.REDIS_FALLBACK and cache.redis_client:
-        await cache.redis_client.close()
-
-
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     status = {
         "status": "healthy",
         "database": "primary" if not settings.DB_FALLBACK else "fallback",
-        "cache": "redis" if not settings.REDIS_FALLBACK else "memory",
+        "cache": cache.backend,
         "queue": "celery" if not settings.CELERY_FALLBACK else "memory",
     }
     return status 
\ No newline at end of file
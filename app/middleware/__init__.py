@@ -1,3 +1,4 @@
+from app.middleware.cache import CacheRule, ResponseCacheMiddleware
 from app.middleware.logging import RequestLoggingMiddleware
 
-__all__ = ["RequestLoggingMiddleware"] 
\ No newline at end of file
+__all__ = ["CacheRule", "RequestLoggingMiddleware", "ResponseCacheMiddleware"] 
\ No newline at end of file
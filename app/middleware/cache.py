@@ -0,0 +1,140 @@
+import hashlib
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.cache import cache, make_key
+
+
+class CacheRule:
+    """A GET route whose responses are cached, with tags formatted from path params."""
+
+    def __init__(self, path: str, tags: Iterable[str] = (), expire: int = 60):
+        self.path = path
+        self.tags = list(tags)
+        self.expire = expire
+        # "/users/{user_id}" -> r"^/users/(?P<user_id>[^/]+)$"
+        parts = re.split(r"\{(\w+)\}", path)
+        pattern = "".join(
+            re.escape(part) if i % 2 == 0 else f"(?P<{part}>[^/]+)"
+            for i, part in enumerate(parts)
+        )
+        self._regex = re.compile(f"^{pattern}$")
+
+    def match(self, path: str) -> Optional[Dict[str, str]]:
+        """Return the path params if the path matches this rule."""
+        match = self._regex.match(path)
+        return match.groupdict() if match else None
+
+
+class ResponseCacheMiddleware:
+    """Serves cached GET responses with strong ETags and answers If-None-Match with 304.
+
+    Only routes matching a ``CacheRule`` are cached, and only successful
+    responses to requests without an Authorization header. Entries are tagged
+    so domain writes can invalidate them through ``cache.invalidate_tags``.
+    """
+
+    def __init__(self, app: ASGIApp, rules: Sequence[CacheRule] = (), max_age: int = 0):
+        self.app = app
+        self.rules = list(rules)
+        self.cache_control = f"max-age={max_age}, must-revalidate"
+
+    def _match(self, path: str) -> Optional[Tuple[CacheRule, Dict[str, str]]]:
+        for rule in self.rules:
+            params = rule.match(path)
+            if params is not None:
+                return rule, params
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+
+        matched = self._match(scope["path"])
+        request_headers = Headers(scope=scope)
+        # Never share responses that may depend on the caller's identity
+        if matched is None or "authorization" in request_headers:
+            return await self.app(scope, receive, send)
+
+        rule, params = matched
+        key = make_key("http", scope["path"], scope["query_string"].decode())
+        if_none_match = request_headers.get("if-none-match")
+
+        entry = await cache.get(key)
+        if entry is not None:
+            await self._send_entry(entry, if_none_match, send, hit=True)
+            return
+
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+
+        async def capture(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+
+        body = b"".join(chunks)
+        if start is None:
+            return
+
+        try:
+            text = body.decode("utf-8")
+        except UnicodeDecodeError:
+            text = None
+        if start["status"] != 200 or text is None:
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in start.get("headers", [])
+            if name.lower() not in (b"etag", b"cache-control")
+        ]
+        entry = {
+            "headers": headers,
+            "body": text,
+            "etag": f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+        }
+        tags = [tag.format(**params) for tag in rule.tags]
+        await cache.set(key, entry, rule.expire, tags=tags)
+        await self._send_entry(entry, if_none_match, send, hit=False)
+
+    async def _send_entry(
+        self,
+        entry: dict,
+        if_none_match: Optional[str],
+        send: Send,
+        hit: bool,
+    ) -> None:
+        validators = [
+            (b"etag", entry["etag"].encode()),
+            (b"cache-control", self.cache_control.encode()),
+            (b"x-cache", b"HIT" if hit else b"MISS"),
+        ]
+        if if_none_match and _etag_matches(if_none_match, entry["etag"]):
+            await send({"type": "http.response.start", "status": 304, "headers": validators})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in entry["headers"]
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers + validators})
+        await send({"type": "http.response.body", "body": entry["body"].encode("utf-8")})
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against a strong ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
@@ -3,6 +3,7 @@ from typing import List, Optional
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import cache
 from app.core.security import get_password_hash
 from app.db.base import Base
 from app.models.user import User
@@ -42,6 +43,7 @@ class UserService:
         self.db.add(user)
         await self.db.commit()
         await self.db.refresh(user)
+        await cache.invalidate_tags("users")
         return user
 
     async def update(self, user_id: int, user_in: UserUpdate) -> User:
@@ -59,6 +61,7 @@ class UserService:
 
         await self.db.commit()
         await self.db.refresh(user)
+        await cache.invalidate_tags(f"user:{user_id}", "users")
         return user
 
     async def delete(self, user_id: int) -> None:
@@ -66,4 +69,5 @@ class UserService:
         user = await self.get(user_id)
         if user:
             await self.db.delete(user)
-            await self.db.commit() 
\ No newline at end of file
+            await self.db.commit()
+            await cache.invalidate_tags(f"user:{user_id}", "users") 
\ No newline at end of file
@@ -1,24 +1,25 @@
+from app.core.async_bridge import run_async
 from app.core.celery import celery_app
-from app.core.circuit_breaker import CircuitBreaker
+from app.core.http import get_http_client
+from app.core.tasks import task
 
 
+# CPU-bound work runs in the process pool when tasks fall back to memory
+@task(name="example_task", executor="process")
 @celery_app.task(name="example_task")
 def example_task(x: int, y: int) -> int:
     """Example task that adds two numbers."""
     return x + y
 
 
+@task(name="example_task_with_circuit_breaker")
 @celery_app.task(name="example_task_with_circuit_breaker")
+@run_async
 async def example_task_with_circuit_breaker(url: str) -> dict:
     """Example task that uses circuit breaker pattern."""
-    circuit_breaker = CircuitBreaker()
-    
-    async def fetch_data():
-        # Simulate external API call
-        import httpx
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
-    
-    return await circuit_breaker.execute(fetch_data) 
\ No newline at end of file
+    # One pooled client, breaker and bulkhead for this downstream, whatever
+    # the URL, so arbitrary hosts can't grow the registries without bound
+    client = get_http_client("example")
+    response = await client.get(url)
+    response.raise_for_status()
+    return response.json()
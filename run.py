@@ -4,19 +4,31 @@ import sys
 from pathlib import Path
 import time
 import logging
-from tenacity import retry, stop_after_attempt, wait_exponential
 
 import uvicorn
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.sql import text
 
+from app.core.retry import retrying
 from app.core.settings import settings
 from app.db.base import Base
-from app.db.session import async_session_factory
+from app.db.session import CONNECTION_ERRORS, async_session_factory
 
 logger = logging.getLogger(__name__)
 
-@retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=4, max=10))
+# Wait up to DB_STARTUP_TIMEOUT for a database that is still starting, but
+# fail straight away on configuration or programming errors
+retry_until_db_ready = retrying(
+    "db.init",
+    timeout=settings.DB_STARTUP_TIMEOUT,
+    max_attempts=None,
+    base_delay=0.5,
+    max_delay=5.0,
+    retry_on=CONNECTION_ERRORS,
+    budget=None,
+)
+
+@retry_until_db_ready
 async def init_db():
     """Initialize the database with retry logic."""
     try:
@@ -29,7 +41,7 @@ async def init_db():
         logger.error(f"❌ Database initialization failed: {e}")
         raise
 
-@retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=4, max=10))
+@retry_until_db_ready
 async def check_db_connection():
     """Check database connection with retry logic."""
     try:
@@ -0,0 +1,121 @@
+"""Measure cold start of the API: importing app.main and running its startup.
+
+Each sample runs in a fresh interpreter, as a new worker or autoscaled
+replica would. Pass --max-import / --max-startup to fail (exit 1) when the
+median exceeds a budget, e.g. in CI:
+
+    python scripts/benchmark_startup.py --runs 5 --max-import 2.0
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SAMPLE = """
+import asyncio, json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter() - start
+started = None
+if {startup}:
+    async def main():
+        begin = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            elapsed = time.perf_counter() - begin
+        return elapsed
+    started = asyncio.run(main())
+print(json.dumps({{"import": imported, "startup": started}}))
+"""
+
+
+def run_sample(startup: bool) -> Dict[str, float]:
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    output = subprocess.run(
+        [sys.executable, "-c", SAMPLE.format(startup=startup)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(count: int) -> List[Tuple[str, float]]:
+    """Return the modules with the highest cumulative import time, in seconds."""
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(modules, key=lambda module: module[1], reverse=True)[:count]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "median": statistics.median(values),
+        "min": min(values),
+        "max": max(values),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to sample")
+    parser.add_argument("--no-startup", action="store_true", help="only measure the import")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--max-import", type=float, help="fail if the median import takes longer (seconds)")
+    parser.add_argument("--max-startup", type=float, help="fail if the median startup takes longer (seconds)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    samples = [run_sample(not args.no_startup) for _ in range(args.runs)]
+    results = {"import": summarize([sample["import"] for sample in samples])}
+    if not args.no_startup:
+        results["startup"] = summarize([sample["startup"] for sample in samples])
+    if args.top:
+        results["slowest_imports"] = slowest_imports(args.top)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for phase in ("import", "startup"):
+            if phase in results:
+                stats = results[phase]
+                print(
+                    f"{phase:>8}: median {stats['median']:.3f}s "
+                    f"(min {stats['min']:.3f}s, max {stats['max']:.3f}s, {args.runs} runs)"
+                )
+        if args.top:
+            print("\nSlowest imports (cumulative):")
+            for name, seconds in results["slowest_imports"]:
+                print(f"  {seconds:8.3f}s  {name}")
+
+    failed = False
+    if args.max_import is not None and results["import"]["median"] > args.max_import:
+        print(f"Import median exceeds {args.max_import}s", file=sys.stderr)
+        failed = True
+    if args.max_startup is not None and "startup" in results and results["startup"]["median"] > args.max_startup:
+        print(f"Startup median exceeds {args.max_startup}s", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from app.core.bulkhead import AIMDLimit, Bulkhead, BulkheadFullError, GradientLimit, StaticLimit
+from app.core.circuit_breaker import CircuitBreaker
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_queues_then_rejects() -> None:
+    """Test that calls over the limit queue briefly and are then rejected."""
+    bulkhead = Bulkhead("test", StaticLimit(1), max_queue=1, queue_timeout=0.05)
+    gate = asyncio.Event()
+
+    async def hold() -> str:
+        await gate.wait()
+        return "done"
+
+    running = asyncio.create_task(bulkhead.run(hold))
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(bulkhead.run(hold))
+    await asyncio.sleep(0)
+
+    # The queue is full, so this one is turned away at once
+    with pytest.raises(BulkheadFullError, match="queue_full"):
+        await bulkhead.run(hold)
+
+    gate.set()
+    assert await asyncio.gather(running, queued) == ["done", "done"]
+    assert bulkhead.inflight == 0
+
+    gate.clear()
+    running = asyncio.create_task(bulkhead.run(hold))
+    await asyncio.sleep(0)
+    with pytest.raises(BulkheadFullError, match="queue_timeout"):
+        await bulkhead.run(hold)
+    gate.set()
+    await running
+    assert bulkhead.inflight == 0 and not bulkhead._waiters
+
+
+def test_adaptive_limits_follow_latency() -> None:
+    """Test that AIMD and gradient limits back off when the dependency degrades."""
+    aimd = AIMDLimit(limit=10, latency_threshold=1.0)
+    aimd.update(0.1, inflight=8, dropped=False)
+    assert aimd.limit == 11
+    aimd.update(0.1, inflight=1, dropped=False)
+    assert aimd.limit == 11
+    aimd.update(2.0, inflight=8, dropped=False)
+    assert aimd.limit == pytest.approx(9.9)
+
+    gradient = GradientLimit(limit=20, smoothing=1.0)
+    for _ in range(20):
+        gradient.update(0.01, inflight=20, dropped=False)
+    steady = gradient.limit
+    assert steady > 20
+    for _ in range(20):
+        gradient.update(0.5, inflight=int(gradient.limit), dropped=False)
+    assert gradient.limit < steady
+
+
+@pytest.mark.asyncio
+async def test_breaker_returns_half_open_slot_when_bulkhead_rejects() -> None:
+    """Test that a bulkhead rejection doesn't use up a half-open trial call."""
+    bulkhead = Bulkhead("bh", StaticLimit(1), max_queue=0)
+    breaker = CircuitBreaker("bh", half_open_max_calls=1, reset_timeout=0, bulkhead=bulkhead)
+    breaker._open()
+    bulkhead.inflight = 1
+
+    async def succeed() -> str:
+        return "ok"
+
+    with pytest.raises(BulkheadFullError):
+        await breaker.call(succeed)
+    assert breaker.state == "half-open" and breaker._half_open_calls == 0
+
+    bulkhead.inflight = 0
+    assert await breaker.call(succeed) == "ok"
+    assert breaker.state == "closed"
+    assert bulkhead.inflight == 0
@@ -0,0 +1,445 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+from prometheus_client import REGISTRY
+
+import app.core.cache as cache_module
+from app.core.cache import Cache, cache, cached, make_key
+from app.core.memory_cache import MemoryCache
+from app.core import serialization
+from app.core.serialization import Serializer
+from app.core.settings import settings
+from app.domains.users.schemas import User as UserSchema
+
+
+@pytest.fixture
+def redis_cache():
+    """A Cache on fakeredis that trips after one failure and probes quickly."""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    redis_cache = Cache()
+    redis_cache.use_fallback = False
+    redis_cache._redis_client = fakeredis.aioredis.FakeRedis(server=server)
+    redis_cache.health.failure_threshold = 1
+    redis_cache.health.probe_interval = 0.01
+    return redis_cache, server
+
+
+async def wait_for_backend(cache: Cache, backend: str) -> None:
+    for _ in range(100):
+        if cache.backend == backend:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"cache never switched to {backend}")
+
+
+def test_memory_cache_expires_entries(monkeypatch) -> None:
+    """Test that entries expire after their TTL."""
+    cache = MemoryCache()
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.set("key", "value", expire=10)
+    assert cache.get("key") == "value"
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_memory_cache_evicts_least_recently_used() -> None:
+    """Test LRU eviction against the entry budget."""
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.evictions == 1
+
+
+def test_memory_cache_evicts_against_byte_budget() -> None:
+    """Test eviction against the byte budget."""
+    cache = MemoryCache(max_bytes=1024)
+    for i in range(50):
+        cache.set(f"key{i}", "x" * 100)
+
+    assert cache.stats()["bytes"] <= 1024
+    assert cache.evictions > 0
+    assert "key49" in cache
+
+
+def test_memory_cache_sweep_removes_expired(monkeypatch) -> None:
+    """Test the periodic sweep drops expired entries."""
+    cache = MemoryCache()
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.set("short", 1, expire=1)
+    cache.set("long", 2, expire=100)
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 2)
+    assert cache.sweep() == 1
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_coalesces_concurrent_misses() -> None:
+    """Test that concurrent misses for one key run the function once."""
+    calls = 0
+
+    @cached(expire=60)
+    async def load(x: int) -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return x * 2
+
+    results = await asyncio.gather(*[load(21) for _ in range(10)])
+    assert results == [42] * 10
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_serves_stale_values_while_refreshing() -> None:
+    """Test that an expired entry is served once while a background task refreshes it."""
+    calls = 0
+    refreshed = asyncio.Event()
+
+    @cached(expire=60, stale_ttl=60, namespace="stale")
+    async def load(x: int) -> int:
+        nonlocal calls
+        calls += 1
+        if calls > 1:
+            refreshed.set()
+        return x * calls
+
+    assert await load(5) == 5
+    key = make_key("stale", {"x": 5})
+    await cache.set(key, {"value": 5, "fresh_until": time.time() - 1}, 60)
+
+    # Concurrent stale reads share one refresh
+    assert await asyncio.gather(load(5), load(5)) == [5, 5]
+    await asyncio.wait_for(refreshed.wait(), 1)
+    await asyncio.sleep(0)
+    assert await load(5) == 10
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_lock_reuses_a_value_stored_while_waiting(redis_cache, monkeypatch) -> None:
+    """Test that a locked load waits for another process and reuses what it stored."""
+    fakeredis = pytest.importorskip("fakeredis")
+    shared, server = redis_cache
+    monkeypatch.setattr(cache_module, "cache", shared)
+    calls = 0
+
+    @cached(expire=60, lock=True, namespace="locked")
+    async def load(x: int) -> int:
+        nonlocal calls
+        calls += 1
+        return x * 2
+
+    key = make_key("locked", {"x": 21})
+    other_process = fakeredis.aioredis.FakeRedis(server=server)
+    held = other_process.lock(f"lock:{key}", timeout=10)
+    assert await held.acquire()
+
+    callers = [asyncio.create_task(load(21)) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    assert not any(caller.done() for caller in callers)
+    await shared.set(key, {"value": 99, "fresh_until": time.time() + 60}, 60)
+    await held.release()
+
+    assert await asyncio.gather(*callers) == [99, 99, 99]
+    assert calls == 0
+
+
+def test_cached_keeps_sessions_out_of_detached_loads() -> None:
+    """Test that session-taking functions can't be cached with background or locked loads."""
+    for options in ({"stale_ttl": 60}, {"lock": True}):
+        with pytest.raises(ValueError):
+            @cached(ignore=("self", "db"), **options)
+            async def get_user(db, user_id: int) -> dict:
+                return {"id": user_id}
+
+
+@pytest.mark.asyncio
+async def test_cached_loads_session_functions_in_the_caller() -> None:
+    """Test that misses for session-taking functions run in the caller's own task."""
+    tasks = set()
+
+    @cached(expire=60, ignore=("db",), namespace="session_load")
+    async def get_user(db, user_id: int) -> dict:
+        tasks.add(asyncio.current_task())
+        return {"id": user_id}
+
+    async def request() -> dict:
+        result = await get_user(object(), 3)
+        assert tasks == {asyncio.current_task()}
+        return result
+
+    assert await asyncio.create_task(request()) == {"id": 3}
+    # Sessions are no longer ignored unless named
+    with pytest.raises(TypeError):
+        await cached()(get_user.__wrapped__)(object(), 3)
+
+
+@pytest.mark.parametrize("codec", ["json", "orjson", "msgpack"])
+@pytest.mark.parametrize("compression", [None, "zlib", "zstd", "lz4"])
+def test_serializer_round_trips_models_and_datetimes(codec: str, compression: str) -> None:
+    """Test that every codec round-trips pydantic models and datetimes."""
+    serializer = Serializer(codec=codec, compression=compression, compression_min_bytes=16)
+    value = {
+        "user": UserSchema(id=1, email="test@example.com", full_name="Test User"),
+        "seen_at": datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc),
+        "items": list(range(100)),
+    }
+
+    assert serializer.loads(serializer.dumps(value)) == value
+
+
+def test_serializer_reads_payloads_from_other_codecs() -> None:
+    """Test that readers decode whatever codec wrote a payload."""
+    writer = Serializer(codec="orjson", compression="zlib", compression_min_bytes=1)
+    reader = Serializer(codec="json")
+
+    assert reader.loads(writer.dumps({"a": [1, 2, 3]})) == {"a": [1, 2, 3]}
+    assert reader.loads(b'{"legacy": true}') == {"legacy": True}
+
+
+def test_serializer_names_missing_packages(monkeypatch) -> None:
+    """Test that payloads from codecs that aren't installed fail with the package name."""
+    payload = Serializer(codec="msgpack", compression="zstd", compression_min_bytes=1).dumps({"a": 1})
+    monkeypatch.setitem(serialization._COMPRESSORS_BY_ID, 2, ("zstd", None, False))
+    with pytest.raises(ValueError, match="zstandard is not installed"):
+        Serializer().loads(payload)
+
+    monkeypatch.setitem(serialization._CODECS_BY_ID, 3, ("msgpack", None, False))
+    with pytest.raises(ValueError, match="msgpack is not installed"):
+        Serializer().loads(Serializer(codec="msgpack").dumps({"a": 1}))
+
+
+def test_make_key_is_stable_and_bounded() -> None:
+    """Test that keys ignore argument order and stay short."""
+    key = make_key("users.get", {"user_id": 1, "detail": "x" * 1000})
+
+    assert key == make_key("users.get", {"detail": "x" * 1000, "user_id": 1})
+    assert key != make_key("users.get", {"user_id": 1, "detail": "x" * 1000}, version=2)
+    assert len(key) < 100
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tags_drops_tagged_entries() -> None:
+    """Test that invalidating a tag drops every cached entry carrying it."""
+    calls = 0
+
+    class Service:
+        @cached(expire=60, tags=lambda self, user_id: [f"user:{user_id}"])
+        async def get(self, user_id: int) -> dict:
+            nonlocal calls
+            calls += 1
+            return {"id": user_id}
+
+    await Service().get(7)
+    await Service().get(7)
+    assert calls == 1
+
+    await cache.invalidate_tags("user:7")
+    await Service().get(7)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_health_trips_to_memory_and_recovers(redis_cache) -> None:
+    """Test that Redis failures trip to memory until a probe succeeds."""
+    cache, server = redis_cache
+    await cache.set("health:a", 1)
+    assert cache.backend == "redis"
+
+    server.connected = False
+    assert await cache.get("health:a") is None
+    assert cache.backend == "memory"
+    await cache.set("health:b", 2)
+    assert await cache.get("health:b") == 2
+
+    server.connected = True
+    await wait_for_backend(cache, "redis")
+    assert await cache.get("health:a") == 1
+
+
+@pytest.mark.asyncio
+async def test_writes_while_tripped_are_cleared_from_redis(redis_cache) -> None:
+    """Test that keys and tags changed in memory don't leave Redis stale after recovery."""
+    cache, server = redis_cache
+    await cache.set("stale:set", "old")
+    await cache.set("stale:deleted", "old")
+    await cache.set("stale:tagged", "old", tags=["stale"])
+    await cache.set("stale:untouched", "kept")
+
+    server.connected = False
+    await cache.get("stale:set")
+    assert cache.backend == "memory"
+    await cache.set("stale:set", "new")
+    await cache.delete("stale:deleted")
+    await cache.invalidate_tags("stale")
+
+    server.connected = True
+    await wait_for_backend(cache, "redis")
+    assert await cache.get("stale:set") is None
+    assert await cache.get("stale:deleted") is None
+    assert await cache.get("stale:tagged") is None
+    assert await cache.get("stale:untouched") == "kept"
+
+
+def near_cache(server) -> Cache:
+    """A Cache on the fakeredis server with an L1 near cache in front of it."""
+    import fakeredis
+
+    near_cache = Cache()
+    near_cache.use_fallback = False
+    near_cache._redis_client = fakeredis.aioredis.FakeRedis(server=server)
+    near_cache.local_cache = MemoryCache(max_entries=100)
+    return near_cache
+
+
+@pytest.mark.asyncio
+async def test_near_cache_serves_hits_locally(redis_cache) -> None:
+    """Test that values read or written once are served without Redis."""
+    _, server = redis_cache
+    cache = near_cache(server)
+    await cache.set("near:written", {"a": 1})
+    await cache.redis_client.set("near:read", cache.serializer.dumps("remote"))
+    assert await cache.get("near:read") == "remote"
+
+    await cache.redis_client.delete("near:written", "near:read")
+    assert await cache.get("near:written") == {"a": 1}
+    assert await cache.get("near:read") == "remote"
+
+
+@pytest.mark.asyncio
+async def test_near_cache_entries_expire(redis_cache, monkeypatch) -> None:
+    """Test that near cache entries live at most CACHE_L1_TTL."""
+    _, server = redis_cache
+    cache = near_cache(server)
+    monkeypatch.setattr(settings, "CACHE_L1_TTL", 0.05)
+    await cache.set("near:ttl", "old")
+    await cache.redis_client.set("near:ttl", cache.serializer.dumps("new"))
+    assert await cache.get("near:ttl") == "old"
+
+    await asyncio.sleep(0.1)
+    assert await cache.get("near:ttl") == "new"
+
+
+@pytest.mark.asyncio
+async def test_near_cache_is_invalidated_by_other_instances(redis_cache) -> None:
+    """Test that writes from another instance evict the key over pub/sub."""
+    _, server = redis_cache
+    writer, reader = near_cache(server), near_cache(server)
+    await reader.start()
+    try:
+        await writer.set("near:shared", "old")
+        assert await reader.get("near:shared") == "old"
+        # Let the listener subscribe before the next write publishes
+        await asyncio.sleep(0.05)
+
+        await writer.set("near:shared", "new")
+        for _ in range(100):
+            if "near:shared" not in reader.local_cache:
+                break
+            await asyncio.sleep(0.01)
+        assert await reader.get("near:shared") == "new"
+
+        await writer.delete("near:shared")
+        await asyncio.sleep(0.05)
+        assert await reader.get("near:shared") is None
+    finally:
+        await reader.stop()
+
+
+@pytest.mark.asyncio
+async def test_metrics_count_lookups_loads_and_evictions(redis_cache, monkeypatch) -> None:
+    """Test that the registry reports cache hits, misses, loads and near cache evictions."""
+    shared, server = redis_cache
+    shared.local_cache = MemoryCache(max_entries=1)
+    monkeypatch.setattr(cache_module, "cache", shared)
+
+    def sample(name: str, **labels: str) -> float:
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    counted = {
+        ("cache_lookups_total", ("namespace", "metrics"), ("backend", "redis"), ("result", "miss")): 2,
+        ("cache_lookups_total", ("namespace", "metrics"), ("backend", "local"), ("result", "hit")): 1,
+        ("cached_calls_total", ("namespace", "metrics"), ("result", "hit")): 1,
+        ("cached_calls_total", ("namespace", "metrics"), ("result", "miss")): 2,
+        ("cached_load_seconds_count", ("namespace", "metrics")): 2,
+        ("cache_fallback_activations_total", ("operation", "get")): 1,
+    }
+    before = {metric: sample(metric[0], **dict(metric[1:])) for metric in counted}
+
+    @cached(expire=60, namespace="metrics")
+    async def load(x: int) -> int:
+        return x
+
+    await load(1)
+    await load(1)
+    # The near cache holds one entry, so this evicts the first
+    await load(2)
+    server.connected = False
+    await shared.get(make_key("metrics", "down"))
+
+    for metric, expected in counted.items():
+        assert sample(metric[0], **dict(metric[1:])) - before[metric] == expected, metric
+    assert sample("cache_memory_entries", cache="local") == 1
+    assert sample("cache_memory_hits_total", cache="local") == 1
+    assert sample("cache_memory_misses_total", cache="local") == 3
+    assert sample("cache_memory_evictions_total", cache="local") == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_operations_round_trip(redis_cache) -> None:
+    """Test that set_many, get_many and delete_many act on every key in one call."""
+    cache, _ = redis_cache
+    assert await cache.set_many({"batch:a": 1, "batch:b": {"x": 2}}, expire=60)
+
+    assert await cache.get_many(["batch:a", "batch:b", "batch:missing", "batch:a"]) == {
+        "batch:a": 1,
+        "batch:b": {"x": 2},
+    }
+    assert await cache.delete_many(["batch:a", "batch:missing"])
+    assert await cache.get_many(["batch:a", "batch:b"]) == {"batch:b": {"x": 2}}
+    assert await cache.delete_many([])
+
+
+@pytest.mark.asyncio
+async def test_batch_loader_coalesces_concurrent_gets(redis_cache) -> None:
+    """Test that auto-batched gets share MGETs and are timed once, as gets."""
+    cache, _ = redis_cache
+    cache.auto_batch = True
+    cache.loader.max_batch_size = 2
+    await cache.set_many({f"loader:{i}": i for i in range(3)})
+    mgets = 0
+    original = cache.redis_client.mget
+
+    async def counting_mget(*args, **kwargs):
+        nonlocal mgets
+        mgets += 1
+        return await original(*args, **kwargs)
+
+    cache.redis_client.mget = counting_mget
+
+    def timed(operation: str) -> float:
+        labels = {"operation": operation, "namespace": "loader", "backend": "redis"}
+        return REGISTRY.get_sample_value("cache_operation_seconds_count", labels) or 0
+
+    gets, get_manys = timed("get"), timed("get_many")
+    keys = ["loader:0", "loader:1", "loader:0", "loader:2", "loader:missing"]
+    assert await asyncio.gather(*(cache.get(key) for key in keys)) == [0, 1, 0, 2, None]
+    # Four distinct keys in batches of two
+    assert mgets == 2
+    assert not cache.loader._batches
+    assert timed("get") - gets == len(keys)
+    assert timed("get_many") == get_manys
@@ -0,0 +1,197 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core import circuit_breaker
+from app.core.circuit_breaker import CircuitBreaker, CircuitBreakerError
+
+
+async def succeed() -> str:
+    return "ok"
+
+
+async def fail() -> None:
+    raise ConnectionError("down")
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_on_failure_rate_and_probes_half_open(monkeypatch) -> None:
+    """Test the closed, open, half-open and closed transitions."""
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    breaker = CircuitBreaker(
+        "test",
+        failure_rate_threshold=0.5,
+        minimum_calls=4,
+        reset_timeout=10,
+        half_open_max_calls=2,
+    )
+
+    await breaker.call(succeed)
+    await breaker.call(succeed)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitBreakerError):
+        await breaker.call(succeed)
+
+    now += 11
+    # Only half_open_max_calls trial calls are admitted
+    assert breaker._can_execute() and breaker._can_execute()
+    assert breaker.state == "half-open"
+    assert not breaker._can_execute()
+    breaker._record(False, 0.01)
+    breaker._record(False, 0.01)
+    assert breaker.state == "closed"
+
+
+def test_breaker_opens_on_slow_calls() -> None:
+    """Test that slow successes count against the slow-call rate."""
+    breaker = CircuitBreaker("slow", slow_call_rate_threshold=0.5, slow_call_duration=1.0, minimum_calls=2)
+    breaker._record(False, 2.0)
+    breaker._record(False, 2.0)
+    assert breaker.state == "open"
+
+
+def test_breakers_are_shared_by_name(monkeypatch) -> None:
+    """Test that the registry hands out one breaker per downstream."""
+    monkeypatch.setattr(circuit_breaker, "breakers", {})
+    first = circuit_breaker.get_breaker("payments", minimum_calls=3)
+    assert circuit_breaker.get_breaker("payments") is first
+    assert first.minimum_calls == 3
+
+
+class SharedState:
+    """In-memory stand-in for RedisBreakerBackend."""
+
+    def __init__(self) -> None:
+        self.calls = self.failures = self.slow = 0
+        self.open_for = 0.0
+        self.syncs = 0
+
+    async def sync(self, name: str, window: int, calls: int = 0, failures: int = 0, slow: int = 0, since=None):
+        self.syncs += 1
+        self.calls += calls
+        self.failures += failures
+        self.slow += slow
+        return self.calls, self.failures, self.slow, self.open_for
+
+    async def open(self, name: str, reset_timeout: float) -> None:
+        self.open_for = reset_timeout
+
+    async def close(self, name: str) -> None:
+        self.open_for = 0.0
+
+
+@pytest.mark.asyncio
+async def test_shared_state_opens_breakers_in_other_processes() -> None:
+    """Test that one breaker tripping opens its peers after their next sync."""
+    shared = SharedState()
+    tripped = CircuitBreaker("shared", minimum_calls=2, backend=shared, sync_interval=0)
+    peer = CircuitBreaker("shared", minimum_calls=2, backend=shared, sync_interval=0)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await tripped.call(fail)
+    await asyncio.sleep(0)
+    assert tripped.state == "open" and shared.open_for > 0
+
+    # The peer's first call uses its cached state and triggers a sync
+    assert await peer.call(succeed) == "ok"
+    await asyncio.sleep(0)
+    assert peer.state == "open"
+    with pytest.raises(CircuitBreakerError):
+        await peer.call(succeed)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_trial_reopens_instead_of_leaking() -> None:
+    """Test that a cancelled trial call resolves its slot and counts as a failure."""
+    breaker = CircuitBreaker("cancelled", reset_timeout=0, half_open_max_calls=1)
+    breaker._open()
+
+    async def hang() -> None:
+        await asyncio.sleep(10)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(breaker.call(hang), 0.01)
+    assert breaker.state == "open"
+
+    # The next trial is admitted rather than rejected forever
+    assert await breaker.call(succeed) == "ok"
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_timed_out_calls_trip_the_breaker() -> None:
+    """Test that calls cut off by a timeout count as failures."""
+    breaker = CircuitBreaker("hanging", minimum_calls=2, failure_rate_threshold=0.5)
+
+    async def hang() -> None:
+        await asyncio.sleep(10)
+
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(breaker.call(hang), 0.01)
+    assert breaker.state == "open"
+
+
+@pytest.mark.asyncio
+async def test_outcomes_are_buffered_until_the_next_sync() -> None:
+    """Test that calls don't each add a round trip to the shared state."""
+    shared = SharedState()
+    breaker = CircuitBreaker("buffered", minimum_calls=100, backend=shared, sync_interval=60)
+
+    for _ in range(5):
+        await breaker.call(succeed)
+    with pytest.raises(ConnectionError):
+        await breaker.call(fail)
+    await asyncio.sleep(0)
+    # The first call started the only sync, which flushed every outcome so far
+    assert shared.syncs == 1
+    assert (shared.calls, shared.failures) == (6, 1)
+
+    for _ in range(3):
+        await breaker.call(succeed)
+    await asyncio.sleep(0)
+    assert shared.syncs == 1 and shared.calls == 6
+
+    breaker._synced_at = float("-inf")
+    await breaker.call(succeed)
+    await asyncio.sleep(0)
+    assert shared.syncs == 2 and shared.calls == 10
+
+
+@pytest.mark.asyncio
+async def test_closing_keeps_the_fleet_window() -> None:
+    """Test that a breaker closing after its trials leaves other processes' counts alone."""
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = circuit_breaker.RedisBreakerBackend(fakeredis.aioredis.FakeRedis())
+    breaker = CircuitBreaker("fleet", minimum_calls=2, reset_timeout=0, backend=backend, sync_interval=0)
+    peer = CircuitBreaker("fleet", minimum_calls=100, backend=backend, sync_interval=0)
+
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            await peer.call(fail)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+    await asyncio.sleep(0)
+    await peer.call(succeed)
+    await asyncio.sleep(0)
+    assert breaker.state == "open"
+
+    # Half-open trials close the breaker, which clears only the open state
+    for _ in range(breaker.half_open_max_calls):
+        await breaker.call(succeed)
+    await asyncio.sleep(0)
+    assert breaker.state == "closed"
+    calls, failures, _, open_for = await backend.sync("fleet", breaker.window)
+    assert (calls, failures, open_for) == (7, 6, 0)
+
+    # The counts that tripped it don't reopen it while they age out
+    await breaker.call(succeed)
+    await asyncio.sleep(0.01)
+    assert breaker.state == "closed"
@@ -0,0 +1,133 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core import retry
+from app.core.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_SECONDS,
+    DB_POOL_OVERFLOW,
+    DB_POOL_PINGS,
+    DB_REQUESTS_SHED,
+)
+from app.core.settings import settings
+from app.db import session
+from app.db.pool import install_idle_pre_ping, install_pool_metrics, warm_pool
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_and_idle_pre_ping(tmp_path, monkeypatch) -> None:
+    """Test pool usage metrics, warming and replacing connections that fail the idle ping."""
+    monkeypatch.setattr(settings, "DB_POOL_PRE_PING", "idle")
+    monkeypatch.setattr(settings, "DB_POOL_PRE_PING_IDLE", 0)
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 2)
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_logging_name="test",
+        pool_size=2,
+        max_overflow=1,
+    )
+    install_idle_pre_ping(engine, "test")
+    install_pool_metrics(engine, "test")
+
+    await warm_pool(engine, 5)
+    assert engine.sync_engine.pool.checkedin() == 2
+    assert DB_POOL_OVERFLOW.labels("test")._value.get() == 0
+
+    async with engine.connect() as conn:
+        assert DB_POOL_CHECKED_OUT.labels("test")._value.get() == 1
+        await conn.execute(text("SELECT 1"))
+        async with engine.connect(), engine.connect():
+            assert DB_POOL_CHECKED_OUT.labels("test")._value.get() == 3
+            assert DB_POOL_OVERFLOW.labels("test")._value.get() == 1
+    assert DB_POOL_CHECKED_OUT.labels("test")._value.get() == 0
+    # The overflow connection is closed rather than kept idle
+    assert DB_POOL_OVERFLOW.labels("test")._value.get() == 0
+    assert DB_POOL_PINGS.labels("test", "ok")._value.get() >= 1
+
+    # A connection that fails its ping is discarded and the checkout retried
+    dialect = engine.sync_engine.dialect
+    pings = []
+
+    def flaky_ping(dbapi_connection):
+        pings.append(dbapi_connection)
+        if len(pings) == 1:
+            raise ConnectionError("server closed the connection")
+        return True
+
+    monkeypatch.setattr(dialect, "do_ping", flaky_ping)
+    async with engine.connect() as conn:
+        assert (await conn.execute(text("SELECT 1"))).scalar() == 1
+    assert DB_POOL_PINGS.labels("test", "disconnected")._value.get() == 1
+    assert DB_POOL_CHECKED_OUT.labels("test")._value.get() == 0
+    assert DB_POOL_OVERFLOW.labels("test")._value.get() == 0
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_get_db_sheds_when_pool_is_exhausted(tmp_path, monkeypatch) -> None:
+    """Test that get_db answers 503 with Retry-After instead of waiting out the pool timeout."""
+    monkeypatch.setattr(settings, "DB_ACQUIRE_TIMEOUT", 0.1)
+    monkeypatch.setattr(retry, "policies", {})
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'shed.db'}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=30,
+    )
+    monkeypatch.setattr(session, "_engine", None)
+    monkeypatch.setattr(session, "_session_factory", None)
+    session._use_engine(engine)
+    shed = DB_REQUESTS_SHED.labels("acquire_timeout")._value.get()
+    waits = DB_POOL_CHECKOUT_SECONDS.labels("default")._sum.get()
+
+    async with engine.connect():
+        start = time.monotonic()
+        with pytest.raises(HTTPException) as error:
+            await session.get_db().__anext__()
+        assert time.monotonic() - start < 1
+
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"] == str(settings.DB_SHED_RETRY_AFTER)
+    assert DB_REQUESTS_SHED.labels("acquire_timeout")._value.get() == shed + 1
+    assert DB_POOL_CHECKOUT_SECONDS.labels("default")._sum.get() - waits >= 0.1
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_startup_waits_out_connection_errors_only(monkeypatch) -> None:
+    """Test that startup retries connection errors but fails fast on anything else."""
+    monkeypatch.setattr(settings, "DB_FALLBACK", False)
+    monkeypatch.setattr(settings, "DB_POOL_WARM", 0)
+    monkeypatch.setattr(retry, "policies", {})
+    monkeypatch.setattr(retry.RetryPolicy, "backoff", lambda self, attempt: 0)
+    monkeypatch.setattr(session, "_engine", None)
+    monkeypatch.setattr(session, "_session_factory", None)
+    attempts = []
+
+    async def starting_up(engine) -> None:
+        attempts.append(engine)
+        if len(attempts) < 3:
+            raise ConnectionRefusedError("database is starting")
+
+    monkeypatch.setattr(session, "_ping", starting_up)
+    await session.connect_db()
+    assert len(attempts) == 3
+
+    async def misconfigured(engine) -> None:
+        attempts.append(engine)
+        raise InvalidRequestError("bad configuration")
+
+    attempts.clear()
+    monkeypatch.setattr(session, "_ping", misconfigured)
+    with pytest.raises(InvalidRequestError):
+        await session.connect_db()
+    assert len(attempts) == 1
+    await session.close_db()
@@ -0,0 +1,77 @@
+import httpx
+import pytest
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitBreakerError
+from app.core.http import HTTPClient
+from app.core.metrics import HTTP_CLIENT_REQUEST_SECONDS
+from app.core.retry import RetryPolicy, policies
+
+
+def flaky_transport(statuses):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.method)
+        return httpx.Response(statuses[min(len(calls), len(statuses)) - 1], json={"ok": True})
+
+    return httpx.MockTransport(handler), calls
+
+
+@pytest.mark.asyncio
+async def test_idempotent_requests_retry_server_errors(monkeypatch) -> None:
+    """Test that GETs retry 5xx responses and record their latency."""
+    # Retry delays come from the shared policy for this breaker
+    monkeypatch.setitem(policies, "http:retry", RetryPolicy("http:retry", base_delay=0, max_delay=0))
+    transport, calls = flaky_transport([503, 200])
+    breaker = CircuitBreaker("http:retry", retry_count=3)
+    client = HTTPClient("retry", breaker=breaker, transport=transport)
+
+    response = await client.get("http://api.example.com/items")
+    await client.aclose()
+
+    assert response.status_code == 200
+    assert calls == ["GET", "GET"]
+    sample = HTTP_CLIENT_REQUEST_SECONDS.labels("retry", "GET", "503")
+    assert sample._sum.get() > 0
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_requests_are_not_retried() -> None:
+    """Test that POSTs fail on the first server error."""
+    transport, calls = flaky_transport([503, 200])
+    client = HTTPClient("once", breaker=CircuitBreaker("http:once"), transport=transport)
+
+    with pytest.raises(CircuitBreakerError) as error:
+        await client.post("http://api.example.com/items", json={})
+    await client.aclose()
+    assert isinstance(error.value.__cause__, httpx.HTTPStatusError)
+    assert calls == ["POST"]
+
+
+@pytest.mark.asyncio
+async def test_failed_requests_raise_the_same_error_for_every_method(monkeypatch) -> None:
+    """Test that retried and single-attempt requests fail with the same error."""
+    monkeypatch.setitem(policies, "http:same", RetryPolicy("http:same", max_attempts=2, base_delay=0, max_delay=0))
+    transport, calls = flaky_transport([503])
+    client = HTTPClient("same", breaker=CircuitBreaker("http:same", retry_count=2), transport=transport)
+
+    for method in ("GET", "POST"):
+        with pytest.raises(CircuitBreakerError) as error:
+            await client.request(method, "http://api.example.com/items")
+        assert isinstance(error.value.__cause__, httpx.HTTPStatusError)
+    await client.aclose()
+    assert calls == ["GET", "GET", "POST"]
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_rejects_without_sending() -> None:
+    """Test that an open breaker stops requests before they reach the network."""
+    transport, calls = flaky_transport([200])
+    breaker = CircuitBreaker("http:open")
+    breaker._open()
+    client = HTTPClient("open", breaker=breaker, transport=transport)
+
+    with pytest.raises(CircuitBreakerError):
+        await client.get("http://api.example.com/items")
+    await client.aclose()
+    assert calls == []
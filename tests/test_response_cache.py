@@ -0,0 +1,57 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.cache import cache
+from app.middleware import CacheRule, ResponseCacheMiddleware
+
+
+def create_app() -> tuple[FastAPI, list]:
+    """Create an app with one cached route that records its calls."""
+    calls = []
+    app = FastAPI()
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        rules=[CacheRule("/items/{item_id}", tags=["item:{item_id}"])],
+    )
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int) -> dict:
+        calls.append(item_id)
+        return {"id": item_id}
+
+    @app.put("/items/{item_id}")
+    async def update_item(item_id: int) -> dict:
+        await cache.invalidate_tags(f"item:{item_id}")
+        return {"id": item_id}
+
+    return app, calls
+
+
+def test_cached_response_is_served_with_etag() -> None:
+    """Test that repeat GETs are served from cache with a strong ETag."""
+    app, calls = create_app()
+    client = TestClient(app)
+
+    first = client.get("/items/1")
+    second = client.get("/items/1")
+
+    assert first.json() == second.json() == {"id": 1}
+    assert first.headers["etag"] == second.headers["etag"]
+    assert second.headers["x-cache"] == "HIT"
+    assert calls == [1]
+
+
+def test_if_none_match_returns_304_until_invalidated() -> None:
+    """Test conditional GETs and tag invalidation on writes."""
+    app, calls = create_app()
+    client = TestClient(app)
+    etag = client.get("/items/2").headers["etag"]
+
+    response = client.get("/items/2", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert calls == [2]
+
+    client.put("/items/2")
+    response = client.get("/items/2", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert calls == [2, 2]
@@ -0,0 +1,97 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.middleware import RequestDeadlineMiddleware
+from app.core.retry import RetryBudget, RetryPolicy, deadline, remaining_time
+
+
+def flaky(failures: int):
+    calls = 0
+
+    async def call() -> int:
+        nonlocal calls
+        calls += 1
+        if calls <= failures:
+            raise ConnectionError("transient")
+        return calls
+
+    return call
+
+
+@pytest.mark.asyncio
+async def test_policy_retries_until_success() -> None:
+    """Test that transient failures are retried with short jittered delays."""
+    policy = RetryPolicy("flaky", max_attempts=3, base_delay=0.01, max_delay=0.02)
+    assert await policy.run(flaky(2)) == 3
+
+    with pytest.raises(ConnectionError):
+        await policy.run(flaky(3))
+
+
+@pytest.mark.asyncio
+async def test_policy_respects_the_callers_deadline() -> None:
+    """Test that retries stop rather than outlive the caller's time budget."""
+    policy = RetryPolicy("slow", max_attempts=10, base_delay=0.05, max_delay=0.05)
+
+    async def hang() -> None:
+        await asyncio.sleep(1)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    with deadline(0.1):
+        with pytest.raises((ConnectionError, asyncio.TimeoutError)):
+            await policy.run(flaky(100))
+        with pytest.raises(asyncio.TimeoutError):
+            await policy.run(hang)
+    assert loop.time() - start < 0.3
+
+
+@pytest.mark.asyncio
+async def test_budget_caps_retries_during_an_outage() -> None:
+    """Test that retries stop once the dependency's budget is spent."""
+    budget = RetryBudget(ratio=0.1, min_per_second=0, max_tokens=2)
+    policy = RetryPolicy("down", max_attempts=5, base_delay=0, max_delay=0, budget=budget)
+    attempts = 0
+
+    async def down() -> None:
+        nonlocal attempts
+        attempts += 1
+        raise ConnectionError("down")
+
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            await policy.run(down)
+    # Five calls, plus retries only while the two starting tokens last
+    assert attempts == 5 + 2
+
+
+@pytest.mark.asyncio
+async def test_unbounded_policy_retries_until_the_deadline() -> None:
+    """Test that max_attempts=None retries until the timeout and needs one."""
+    policy = RetryPolicy("unbounded", max_attempts=None, base_delay=0.01, max_delay=0.01)
+    assert await policy.run(flaky(20), timeout=2) == 21
+
+    with pytest.raises(ConnectionError):
+        await policy.run(flaky(1000), timeout=0.1)
+    with pytest.raises(ValueError):
+        await policy.run(flaky(1))
+
+
+@pytest.mark.asyncio
+async def test_requests_run_under_a_deadline() -> None:
+    """Test that the middleware gives each request a time budget."""
+    app = FastAPI()
+    app.add_middleware(RequestDeadlineMiddleware, seconds=5)
+
+    @app.get("/budget")
+    async def budget() -> dict:
+        return {"remaining": remaining_time()}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/budget")
+    assert 4 < response.json()["remaining"] <= 5
+    assert remaining_time() is None
+
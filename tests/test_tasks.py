@@ -0,0 +1,436 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from celery import Celery
+from kombu import serialization
+
+from app.core import tasks
+from app.core.async_bridge import AsyncBridge, run_async
+from app.core.celery import celery_app
+from app.core.payloads import store_payload
+from app.core.journal import SpillJournal
+from app.core.tasks import FallbackDispatcher, register_task
+from app.core.settings import Settings, settings
+
+
+@pytest.fixture(autouse=True)
+def spill_to_tmp_path(tmp_path, monkeypatch) -> None:
+    """Keep spill journals written by TaskQueues out of the working directory."""
+    monkeypatch.setattr(settings, "TASK_SPILL_PATH", str(tmp_path / "task_spill.db"))
+
+
+@pytest.fixture
+def memory_celery(monkeypatch) -> Celery:
+    """A Celery app on the in-memory broker and result backend.
+
+    Celery prefers CELERY_BROKER_URL and CELERY_RESULT_BACKEND from the
+    environment over its arguments, so those are cleared first.
+    """
+    monkeypatch.delenv("CELERY_BROKER_URL", raising=False)
+    monkeypatch.delenv("CELERY_RESULT_BACKEND", raising=False)
+    return Celery("test", broker="memory://", backend="cache+memory://")
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_runs_registered_tasks_concurrently(monkeypatch) -> None:
+    """Test that queued tasks run on the worker pool and store results."""
+    monkeypatch.setattr(tasks, "registry", {})
+    running = 0
+    peak = 0
+
+    async def slow_double(x: int) -> int:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return x * 2
+
+    register_task("slow_double", slow_double)
+    dispatcher = FallbackDispatcher(workers=3, max_size=10)
+    runner = asyncio.create_task(dispatcher.run())
+    try:
+        ids = [await dispatcher.submit("slow_double", (i,), {}) for i in range(6)]
+        await asyncio.wait_for(dispatcher.queue.join(), timeout=5)
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+    assert [tasks.fallback_results.get(task_id) for task_id in ids] == [0, 2, 4, 6, 8, 10]
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_serves_lanes_by_priority(monkeypatch) -> None:
+    """Test that queued high lane tasks run before earlier low lane tasks."""
+    monkeypatch.setattr(tasks, "registry", {})
+    order = []
+
+    async def record(label: str) -> None:
+        order.append(label)
+
+    register_task("bulk", record, lane="low")
+    register_task("urgent", record, lane="high")
+    dispatcher = FallbackDispatcher(workers=1, max_size=10)
+    for i in range(3):
+        await dispatcher.submit("bulk", (f"bulk{i}",), {})
+    await dispatcher.submit("urgent", ("urgent",), {})
+
+    runner = asyncio.create_task(dispatcher.run())
+    try:
+        await asyncio.wait_for(dispatcher.queue.join(), timeout=5)
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+    assert order == ["urgent", "bulk0", "bulk1", "bulk2"]
+
+
+@pytest.mark.parametrize("lanes", [[], ["high", "low"], ["default", "low", "default"]])
+def test_task_lanes_require_a_unique_default_lane(lanes) -> None:
+    """Test that lane lists the dispatcher can't route to are rejected at startup."""
+    with pytest.raises(ValueError, match="TASK_LANES"):
+        Settings(TASK_LANES=lanes)
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_applies_concurrency_caps_and_rate_limits(monkeypatch) -> None:
+    """Test that throttled tasks are parked without blocking other work."""
+    monkeypatch.setattr(tasks, "registry", {})
+    running = 0
+    peak = 0
+    finished = []
+
+    async def capped(i: int) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        finished.append(("capped", i))
+
+    async def limited(i: int) -> None:
+        finished.append(("limited", i))
+
+    async def free() -> None:
+        finished.append(("free", 0))
+
+    register_task("capped", capped, max_concurrency=1)
+    register_task("limited", limited, rate_limit=20, burst=1)
+    register_task("free", free)
+    dispatcher = FallbackDispatcher(workers=4, max_size=20)
+    runner = asyncio.create_task(dispatcher.run())
+    start = asyncio.get_running_loop().time()
+    try:
+        for i in range(3):
+            await dispatcher.submit("capped", (i,), {})
+            await dispatcher.submit("limited", (i,), {})
+        await dispatcher.submit("free", (), {})
+        await asyncio.wait_for(dispatcher.queue.join(), timeout=5)
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+    assert peak == 1
+    assert len(finished) == 7
+    # Throttled tasks don't hold up unthrottled ones
+    assert finished.index(("free", 0)) < finished.index(("limited", 2))
+    # Three tasks at 20/s with a burst of one take at least 0.1s
+    assert asyncio.get_running_loop().time() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_wait_result_wakes_on_completion(monkeypatch) -> None:
+    """Test that fallback waiters get results, timeouts and task errors."""
+    monkeypatch.setattr(tasks, "registry", {})
+    dispatcher = FallbackDispatcher(workers=1, max_size=10)
+    monkeypatch.setattr(tasks, "dispatcher", dispatcher)
+    release = asyncio.Event()
+
+    async def gated(value: str) -> str:
+        await release.wait()
+        return value
+
+    async def broken() -> None:
+        raise RuntimeError("boom")
+
+    register_task("gated", gated)
+    register_task("broken", broken)
+    queue = tasks.TaskQueue()
+    queue.use_fallback = True
+    runner = asyncio.create_task(dispatcher.run())
+    try:
+        task_id = await queue.delay("gated", "done")
+        with pytest.raises(asyncio.TimeoutError):
+            await queue.wait_result(task_id, timeout=0.05)
+        release.set()
+        assert await queue.wait_result(task_id, timeout=1) == "done"
+        # Later callers read the stored result
+        assert await queue.wait_result(task_id) == "done"
+
+        failed_id = await queue.delay("broken")
+        with pytest.raises(RuntimeError):
+            await queue.wait_result(failed_id, timeout=1)
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_wait_result_polls_the_celery_backend(memory_celery) -> None:
+    """Test that Celery results are picked up by polling, with timeouts and failures."""
+    queue = tasks.TaskQueue()
+    queue.use_fallback = False
+    queue.celery_app = memory_celery
+    backend = queue.celery_app.backend
+
+    with pytest.raises(asyncio.TimeoutError):
+        await queue.wait_result("pending", timeout=0.1)
+
+    asyncio.get_running_loop().call_later(0.1, backend.store_result, "later", 42, "SUCCESS")
+    assert await queue.wait_result("later", timeout=2) == 42
+    assert await queue.get_result("later") == 42
+    assert await queue.get_result("pending") is None
+
+    backend.mark_as_failure("failed", ValueError("bad input"))
+    with pytest.raises(ValueError):
+        await queue.wait_result("failed", timeout=1)
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_delay_many_runs_fallback_chord(monkeypatch) -> None:
+    """Test that a fallback chord callback receives every header result."""
+    monkeypatch.setattr(tasks, "registry", {})
+    dispatcher = FallbackDispatcher(workers=2, max_size=10)
+    monkeypatch.setattr(tasks, "dispatcher", dispatcher)
+
+    async def square(x: int) -> int:
+        return x * x
+
+    async def total(results: list, offset: int) -> int:
+        return sum(results) + offset
+
+    register_task("square", square)
+    register_task("total", total)
+    queue = tasks.TaskQueue()
+    queue.use_fallback = True
+    runner = asyncio.create_task(dispatcher.run())
+    try:
+        task_ids = await queue.delay_many(
+            [("square", (i,), {}) for i in range(4)],
+            callback=("total", (100,), {}),
+        )
+        assert len(task_ids) == 5
+        assert await queue.wait_result(task_ids[-1], timeout=1) == 114
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+
+def test_publish_uses_one_producer_for_a_batch(memory_celery) -> None:
+    """Test that a batch publishes through a single pooled producer."""
+    queue = tasks.TaskQueue()
+    queue.celery_app = memory_celery
+    pool = queue.celery_app.producer_pool
+    acquired = 0
+    original = pool.acquire
+
+    def counting_acquire(*args, **kwargs):
+        nonlocal acquired
+        acquired += 1
+        return original(*args, **kwargs)
+
+    pool.acquire = counting_acquire
+    assert len(queue._publish([("t", (i,), {}) for i in range(3)])) == 3
+    assert acquired == 1
+    assert len(queue._publish([("t", (1,), {})], callback=("cb", (), {}))) == 2
+
+
+@pytest.mark.asyncio
+async def test_spilled_tasks_are_republished_with_their_ids(tmp_path, monkeypatch, memory_celery) -> None:
+    """Test that tasks journaled during an outage are drained to the broker."""
+    queue = tasks.TaskQueue()
+    queue.use_fallback = False
+    queue.celery_app = memory_celery
+    queue.journal = SpillJournal(str(tmp_path / "spill.db"))
+    published = []
+
+    def broken_publish(calls, callback=None, task_ids=None):
+        raise ConnectionError("broker down")
+
+    def recording_publish(calls, callback=None, task_ids=None):
+        published.extend(zip(task_ids, calls))
+        return task_ids
+
+    monkeypatch.setattr(queue, "_publish", broken_publish)
+    first = await queue.delay("add", 1, 2)
+    more = await queue.delay_many([("add", (i, i), {}) for i in range(3)])
+    assert await queue.journal.count() == 4
+
+    monkeypatch.setattr(queue, "_publish", recording_publish)
+    monkeypatch.setattr(queue, "_broker_available", lambda: True)
+    assert await queue.drain_spilled() == 4
+    assert published[0] == (first, ("add", (1, 2), {}))
+    assert [task_id for task_id, _ in published[1:]] == more
+    assert await queue.journal.count() == 0
+    await queue.journal.close()
+
+
+@pytest.mark.asyncio
+async def test_journal_claims_rows_for_one_drainer(tmp_path) -> None:
+    """Test that drainers sharing a journal file never claim the same rows."""
+    path = str(tmp_path / "shared.db")
+    first, second = SpillJournal(path), SpillJournal(path)
+    for i in range(5):
+        await first.append(f"id-{i}", "add", (i,), {})
+
+    claimed = await first.claim(3)
+    rest = await second.claim(10)
+    assert [task_id for _, task_id, _, _, _ in claimed] == ["id-0", "id-1", "id-2"]
+    assert [task_id for _, task_id, _, _, _ in rest] == ["id-3", "id-4"]
+    assert await second.claim(10) == []
+
+    # Released rows, e.g. after a failed publish, can be claimed again
+    await first.release([row_id for row_id, _, _, _, _ in claimed[:1]])
+    assert [task_id for _, task_id, _, _, _ in await second.claim(10)] == ["id-0"]
+    # As can rows whose claim expired, e.g. after their drainer died
+    await first.ack([row_id for row_id, _, _, _, _ in rest])
+    await first.release([row_id for row_id, _, _, _, _ in claimed])
+    assert len(await first.claim(10, lease=-1)) == 3
+    assert len(await second.claim(10)) == 3
+    await first.close()
+    await second.close()
+
+
+@pytest.mark.asyncio
+async def test_thread_tasks_run_off_the_event_loop(monkeypatch) -> None:
+    """Test that thread executor tasks do not run on the loop thread."""
+    monkeypatch.setattr(tasks, "registry", {})
+    spec = register_task("thread_name", lambda: threading.current_thread().name, executor="thread")
+
+    assert (await tasks.run_task(spec, (), {})).startswith("task")
+    tasks.shutdown_executors()
+
+
+def test_register_task_rejects_unknown_executor() -> None:
+    """Test that executor names are validated."""
+    with pytest.raises(ValueError):
+        register_task("bad", lambda: None, executor="gpu")
+
+
+def test_task_decorator_keeps_celery_tasks(monkeypatch, memory_celery) -> None:
+    """Test that @task over a Celery task keeps its API and registers the coroutine."""
+    monkeypatch.setattr(tasks, "registry", {})
+
+    @tasks.task(name="fetch")
+    @memory_celery.task(name="fetch")
+    @run_async
+    async def fetch(url: str) -> str:
+        return url
+
+    assert fetch.name == "fetch"
+    assert callable(fetch.delay) and callable(fetch.apply_async)
+    assert tasks.registry["fetch"].func is fetch.run.__async_task__
+
+
+def test_async_bridge_reuses_one_loop_with_a_concurrency_limit() -> None:
+    """Test that bridged coroutines share a loop and respect the limit."""
+    bridge = AsyncBridge(max_concurrency=2)
+    bridge.start()
+    running = 0
+    peak = 0
+
+    async def work() -> int:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return id(asyncio.get_running_loop())
+
+    try:
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            loops = list(pool.map(lambda _: bridge.run(work()), range(5)))
+    finally:
+        bridge.stop()
+
+    assert len(set(loops)) == 1
+    assert peak == 2
+    assert not bridge.running
+
+
+def test_async_bridge_starts_once_under_concurrent_lazy_runs(monkeypatch) -> None:
+    """Test that threads running coroutines on an unstarted bridge share one loop."""
+    bridge = AsyncBridge(max_concurrency=10)
+    threads = []
+    start_thread = threading.Thread.start
+
+    def counting_start(thread):
+        threads.append(thread.name)
+        start_thread(thread)
+
+    monkeypatch.setattr(threading.Thread, "start", counting_start)
+
+    async def loop_id() -> int:
+        return id(asyncio.get_running_loop())
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            loops = list(pool.map(lambda _: bridge.run(loop_id()), range(8)))
+    finally:
+        bridge.stop()
+
+    assert len(set(loops)) == 1
+    assert threads.count("async-bridge") == 1
+
+
+def test_compact_serializer_round_trips_and_compresses() -> None:
+    """Test that the compact kombu serializer shrinks large task bodies."""
+    body = ((list(range(2000)),), {"note": "x" * 2000}, {})
+    content_type, encoding, data = serialization.dumps(body, serializer="compact")
+    json_size = len(serialization.dumps(body, serializer="json")[2])
+
+    assert len(data) < json_size / 2
+    args, kwargs, _ = serialization.loads(data, content_type, encoding)
+    assert list(args[0]) == list(range(2000))
+    assert kwargs["note"] == "x" * 2000
+
+
+def test_result_policies_set_task_options() -> None:
+    """Test that result policies decide which backend writes happen."""
+    @celery_app.task(name="test_ignored", result_policy="ignore")
+    def ignored() -> None:
+        return None
+
+    @celery_app.task(name="test_stored", result_policy="stored")
+    def stored() -> None:
+        return None
+
+    assert ignored.ignore_result and not ignored.track_started
+    assert not stored.ignore_result and stored.track_started
+
+
+def test_explicit_result_options_override_the_policy() -> None:
+    """Test that ignore_result and track_started passed to a task are kept."""
+    @celery_app.task(name="test_explicit_ignore", ignore_result=True)
+    def explicit_ignore() -> None:
+        return None
+
+    @celery_app.task(name="test_explicit_untracked", result_policy="stored", track_started=False)
+    def explicit_untracked() -> None:
+        return None
+
+    assert explicit_ignore.ignore_result
+    assert not explicit_untracked.ignore_result and not explicit_untracked.track_started
+
+
+@pytest.mark.asyncio
+async def test_payload_refs_are_resolved_before_running() -> None:
+    """Test that tasks receive values passed by reference through the cache."""
+    ref = await store_payload({"rows": list(range(100))})
+    spec = tasks.TaskSpec("size", lambda data, n=None: (len(data["rows"]), n))
+
+    assert await tasks.run_task(spec, (ref,), {"n": 1}) == (100, 1)